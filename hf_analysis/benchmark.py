@@ -0,0 +1,467 @@
+# -*- coding: utf-8 -*-
+
+"""
+性能测试模块，使用合成数据比较不同实现的用时
+
+使用方法：
+    python -m hf_analysis.benchmark [测试名 ...]
+"""
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from os import makedirs
+from os.path import getsize, join
+from typing import Callable, Dict, List, Tuple
+
+# a small alphabet makes the synthetic tags actually appear in the text
+ALPHABET = [chr(0x4e00 + i) for i in range(300)]
+
+
+def _timeit(func: Callable, *args, repeat: int = 3):
+    """返回最短用时（秒）以及最后一次的返回值"""
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def _report(name: str, baseline: float, candidate: float) -> None:
+    print("{:<24s} baseline {:8.3f}s  new {:8.3f}s  speedup x{:.1f}".format(
+        name, baseline, candidate, baseline / max(candidate, 1e-9)))
+
+
+def synthetic_corpus(num_tags: int, num_articles: int, article_length: int,
+                     seed: int = 0) -> Tuple[List[str], Dict[str, str]]:
+    """生成随机的词汇与文章，文章中会插入部分词汇"""
+    rnd = random.Random(seed)
+    tags = list({
+        "".join(rnd.choices(ALPHABET, k=rnd.randint(2, 4)))
+        for _ in range(num_tags)
+    })
+    articles = {}
+    for i in range(num_articles):
+        pieces, length = [], 0
+        while length < article_length:
+            if rnd.random() < 0.3:
+                piece = rnd.choice(tags)
+            else:
+                piece = "".join(rnd.choices(ALPHABET, k=rnd.randint(1, 8)))
+            pieces.append(piece)
+            length += len(piece)
+        articles["文章{}".format(i)] = "".join(pieces)
+    return tags, articles
+
+
+def bench_tag_count(num_tags: int = 2000, num_articles: int = 100,
+                    article_length: int = 20000) -> None:
+    """比较 str.count 与 TagCounter 统计词汇出现次数的用时"""
+    from hf_analysis.processing.tag_counter import TagCounter
+    tags, articles = synthetic_corpus(num_tags, num_articles, article_length)
+
+    def baseline():
+        return {name: {tag: article.count(tag) for tag in tags}
+                for name, article in articles.items()}
+
+    def candidate():
+        counter = TagCounter(tags)
+        return {name: counter.count(article)
+                for name, article in articles.items()}
+
+    baseline_time, expected = _timeit(baseline, repeat=1)
+    candidate_time, result = _timeit(candidate, repeat=1)
+    assert expected == result, "TagCounter 与 str.count 结果不一致！"
+    _report("tag_count", baseline_time, candidate_time)
+
+
+# modules that should only be imported when their stage first runs
+HEAVY_MODULES = [
+    "jieba", "sklearn", "pdf2image", "tesserocr", "pandas", "PIL",
+    "xlsxwriter", "docx2txt", "numpy",
+]
+
+COLD_START_MODULES = [
+    "hf_analysis.cli",
+    "hf_analysis.processing.preprocess",
+    "hf_analysis.processing.load_data",
+    "hf_analysis.processing.word_extraction",
+    "hf_analysis.processing.word_statistics",
+    "hf_analysis.processing.output",
+]
+
+_COLD_START_SCRIPT = """
+import sys, time
+start = time.perf_counter()
+for name in {modules!r}:
+    __import__(name)
+elapsed = time.perf_counter() - start
+print(elapsed)
+print(",".join(m for m in {heavy!r} if m in sys.modules))
+"""
+
+
+def bench_import(repeat: int = 5) -> None:
+    """
+    在新的解释器中导入所有处理模块，报告冷启动用时
+
+    如果有重量级的依赖在导入时被加载则以错误退出，防止冷启动变慢
+    """
+    script = _COLD_START_SCRIPT.format(modules=COLD_START_MODULES,
+                                       heavy=HEAVY_MODULES)
+    best, loaded = None, ""
+    for _ in range(repeat):
+        out = subprocess.check_output([sys.executable, "-c", script])
+        elapsed, loaded = out.decode().split("\n")[:2]
+        best = float(elapsed) if best is None else min(best, float(elapsed))
+    print("{:<24s} {:8.3f}s".format("import", best))
+    if loaded:
+        raise SystemExit("导入时加载了重量级依赖: {}".format(loaded))
+
+
+def synthetic_page(rnd: random.Random, scale: int = 1, mode: str = "L"):
+    """生成一页随机文字块的图像，scale 为 1 时相当于 150 DPI 的 A4 页面"""
+    from PIL import Image, ImageDraw
+    img = Image.new(mode, (1240 * scale, 1754 * scale), "white")
+    draw = ImageDraw.Draw(img)
+    for line in range(60):
+        x = 100
+        while x < 1100:
+            width = rnd.randint(10, 40)
+            draw.rectangle((x * scale, (100 + line * 25) * scale,
+                            (x + width) * scale, (112 + line * 25) * scale),
+                           fill="black")
+            x += width + rnd.randint(5, 15)
+    return img
+
+
+def synthetic_pdf(path: str, pages: int, seed: int = 0) -> None:
+    """生成每页都有随机文字块的 pdf"""
+    rnd = random.Random(seed)
+    images = [synthetic_page(rnd) for _ in range(pages)]
+    images[0].save(path, save_all=True, append_images=images[1:],
+                   resolution=150)
+
+
+def _block_io() -> int:
+    """当前进程与子进程的磁盘读写块数"""
+    import resource
+    total = 0
+    for who in [resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN]:
+        usage = resource.getrusage(who)
+        total += usage.ru_inblock + usage.ru_oublock
+    return total
+
+
+def bench_raster(pages: int = 8, dpi: int = 300) -> None:
+    """比较 pdf 页面写入 temp 文件夹再读取 与 直接在内存中转换 的用时与磁盘读写"""
+    from PIL import Image
+    from pdf2image import convert_from_path
+    from hf_analysis.parameter import get_poppler_path
+    folder = tempfile.mkdtemp()
+    try:
+        pdf_path = join(folder, "synthetic.pdf")
+        synthetic_pdf(pdf_path, pages)
+
+        def on_disk():
+            output = join(folder, "pages")
+            makedirs(output)
+            paths = convert_from_path(
+                pdf_path, dpi=dpi, output_folder=output, fmt="jpg",
+                paths_only=True, poppler_path=get_poppler_path())
+            for p in paths:
+                Image.open(p).convert("L").load()
+            written = sum(getsize(p) for p in paths)
+            shutil.rmtree(output)
+            return written
+
+        def in_memory():
+            images = convert_from_path(pdf_path, dpi=dpi, grayscale=True,
+                                       poppler_path=get_poppler_path())
+            for img in images:
+                img.load()
+            return 0
+
+        for name, func in [("raster on_disk", on_disk),
+                           ("raster in_memory", in_memory)]:
+            before = _block_io()
+            elapsed, written = _timeit(func, repeat=1)
+            print("{:<24s} {:8.3f}s  temp {:8.1f}MB  io blocks {}".format(
+                name, elapsed, written / (1024 * 1024),
+                _block_io() - before))
+    finally:
+        shutil.rmtree(folder)
+
+
+def bench_binarize(crop=(210, 280, 2300, 3050)) -> None:
+    """比较 先二值化再裁剪（lambda）与 先裁剪再二值化（查找表）的用时"""
+    from hf_analysis.parameter import BINARIZE_OTSU, BINARIZE_SAUVOLA, \
+        BINARIZE_THRESHOLD, DEFAULT_BINARIZE
+    from hf_analysis.processing.binarize import binarize
+    # a 300 dpi colour page
+    page = synthetic_page(random.Random(0), scale=2, mode="RGB")
+
+    def baseline():
+        return page.convert("L").point(
+            lambda x: 0 if x < BINARIZE_THRESHOLD else 255, "1").crop(crop)
+
+    def candidate():
+        return binarize(page.crop(crop).convert("L"), DEFAULT_BINARIZE)
+
+    baseline_time, expected = _timeit(baseline)
+    candidate_time, result = _timeit(candidate)
+    assert expected.tobytes() == result.tobytes(), "二值化结果不一致！"
+    _report("binarize", baseline_time, candidate_time)
+    for method in [(BINARIZE_OTSU,), (BINARIZE_SAUVOLA, 25, 0.2)]:
+        elapsed, _ = _timeit(
+            lambda: binarize(page.crop(crop).convert("L"), method))
+        print("{:<24s} {:8.3f}s".format("binarize " + method[0].lower(),
+                                        elapsed))
+
+
+def synthetic_index(path: str, rows: int, seed: int = 0) -> None:
+    """生成有 rows 行的索引文件"""
+    import xlsxwriter
+    rnd = random.Random(seed)
+    workbook = xlsxwriter.Workbook(path, {"constant_memory": True})
+    sheet = workbook.add_worksheet()
+    for col, title in enumerate(["标题", "文件地址", "类别", "排序", "开始页码",
+                                 "结束页码", "附加参数"]):
+        sheet.write_string(0, col, title)
+    for row in range(1, rows + 1):
+        beg = rnd.randint(1, 300)
+        sheet.write_string(row, 0, "".join(rnd.choices(ALPHABET, k=8)))
+        sheet.write_string(row, 1, "report{}.pdf".format(row % 500))
+        sheet.write_number(row, 2, 2000 + row % 20)
+        sheet.write_number(row, 3, row % 20)
+        sheet.write_number(row, 4, beg)
+        sheet.write_number(row, 5, beg + rnd.randint(0, 20))
+        if row % 3 == 0:
+            sheet.write_string(row, 6, "CROP=210/280/2300/3050|LANG=chi_sim")
+    workbook.close()
+
+
+def bench_excel(rows: int = 50000) -> None:
+    """比较 pd.read_excel + iterrows 与 read_excel_rows 读取索引文件的用时"""
+    from hf_analysis.processing.load_data import read_excel_rows
+    folder = tempfile.mkdtemp()
+    try:
+        path = join(folder, "index.xlsx")
+        synthetic_index(path, rows)
+
+        def baseline():
+            import pandas as pd
+            return [list(r) for _, r in pd.read_excel(path).iterrows()]
+
+        def candidate():
+            return list(read_excel_rows(path))
+
+        candidate_time, result = _timeit(candidate, repeat=1)
+        try:
+            baseline_time, _ = _timeit(baseline, repeat=1)
+        except ImportError:
+            print("{:<24s} {:8.3f}s  (pandas 没有安装)".format(
+                "excel", candidate_time))
+            return
+        _report("excel", baseline_time, candidate_time)
+    finally:
+        shutil.rmtree(folder)
+
+
+def synthetic_data_file(path: str, lines: int, seed: int = 0) -> None:
+    """生成预处理输出格式的数据文件，部分段落（例如表格）很长没有句号"""
+    rnd = random.Random(seed)
+    with open(path, "w", encoding="utf8") as f:
+        f.write("# 可信度 | 行内容\n")
+        for i in range(lines):
+            text = "".join(rnd.choices(ALPHABET, k=rnd.randint(10, 40)))
+            # every tenth block of lines has no terminator at all
+            if (i // 50) % 10 != 0 and rnd.random() < 0.4:
+                text += rnd.choice("。！？；.")
+            f.write("{:.2f} | {}\n".format(rnd.random(), text))
+
+
+def bench_sentences(lines: int = 100000) -> None:
+    """比较 对整个文档使用 findall 与 对每个结束符号使用 str.replace 切分句子 的用时"""
+    from hf_analysis.processing.load_data import extract_content, get_text
+    import re
+    folder = tempfile.mkdtemp()
+    try:
+        path = join(folder, "data.txt")
+        synthetic_data_file(path, lines)
+
+        def baseline():
+            text = "".join(
+                line.split("|", 1)[-1].strip() for line in
+                extract_content(path).split("\n") if not line.startswith("#")
+            )
+            return "\n".join(re.findall("(.*?[.。])", text))
+
+        baseline_time, _ = _timeit(baseline)
+        candidate_time, _ = _timeit(get_text, path)
+        _report("sentences", baseline_time, candidate_time)
+    finally:
+        shutil.rmtree(folder)
+
+
+def bench_count_matrix(num_tags: int = 5000, num_categories: int = 10,
+                       articles_per_category: int = 50) -> None:
+    """比较 嵌套字典 与 CountMatrix 保存细节结果并计算每个类别总数的用时与内存"""
+    import tracemalloc
+    # CountMatrix imports numpy lazily, import it before timing so the
+    # import itself is not measured
+    import numpy  # noqa: F401
+    from hf_analysis.processing.count_matrix import CountMatrix
+    rnd = random.Random(0)
+    tags = ["词{}".format(i) for i in range(num_tags)]
+    articles = {
+        "类别{}".format(c): {
+            "文章{}".format(a): [rnd.randint(0, 3) for _ in range(num_tags)]
+            for a in range(articles_per_category)
+        }
+        for c in range(num_categories)
+    }
+
+    def baseline():
+        detail = {}
+        for category, counts in articles.items():
+            detail[category] = {
+                tag: {name: counts[name][row] for name in counts}
+                for row, tag in enumerate(tags)
+            }
+        totals = [[sum(detail[category][tag].values()) for category in detail]
+                  for tag in tags]
+        return detail, totals
+
+    def candidate():
+        detail = CountMatrix(tags, articles)
+        for category, counts in articles.items():
+            for name, values in counts.items():
+                detail.set_counts(category, name, values)
+        return detail, detail.totals().tolist()
+
+    def measure(func):
+        tracemalloc.start()
+        elapsed, result = _timeit(func, repeat=1)
+        peak = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+        tracemalloc.stop()
+        return elapsed, peak, result
+
+    baseline_time, baseline_peak, (_, expected) = measure(baseline)
+    candidate_time, candidate_peak, (_, result) = measure(candidate)
+    assert expected == result, "CountMatrix 与嵌套字典结果不一致！"
+    _report("count_matrix", baseline_time, candidate_time)
+    print("{:<24s} baseline {:7.1f}MB  new {:7.1f}MB".format(
+        "count_matrix memory", baseline_peak, candidate_peak))
+
+
+def bench_token_cache(num_articles: int = 10,
+                      article_length: int = 20000) -> None:
+    """比较 jieba 标注词性的分词 与 从分词缓存中读取 的用时"""
+    import jieba
+    import jieba.posseg
+    from hf_analysis.processing.token_cache import ReplayTokenizer, \
+        TokenCache
+    # real words, runs of unknown characters make the hmm unrealistically
+    # slow
+    words = ["经济", "发展", "科技", "创新", "中国", "人民", "工作", "推动",
+             "建设", "我们", "的", "在", "和", "是", "，", "。"]
+    rnd = random.Random(0)
+    articles = {}
+    for i in range(num_articles):
+        pieces, length = [], 0
+        while length < article_length:
+            pieces.append(rnd.choice(words))
+            length += len(pieces[-1])
+        articles["文章{}".format(i)] = "".join(pieces)
+    tokenizer = jieba.posseg.POSTokenizer(jieba.Tokenizer())
+    tokenizer.tokenizer.initialize()
+    folder = tempfile.mkdtemp()
+    try:
+        replay = ReplayTokenizer(tokenizer, TokenCache(folder), "bench", True)
+
+        def baseline():
+            return [[(p.word, p.flag) for p in tokenizer.cut(article)]
+                    for article in articles.values()]
+
+        def candidate():
+            return [[(p.word, p.flag) for p in replay.cut(article)]
+                    for article in articles.values()]
+
+        baseline_time, expected = _timeit(baseline, repeat=1)
+        # the first pass fills the cache
+        _timeit(candidate, repeat=1)
+        candidate_time, result = _timeit(candidate)
+        assert expected == result, "分词缓存与 jieba 分词结果不一致！"
+        _report("token_cache", baseline_time, candidate_time)
+    finally:
+        shutil.rmtree(folder)
+
+
+def bench_sparse_tfidf(num_articles: int = 2000,
+                       article_length: int = 3000) -> None:
+    """比较 逐篇 extract_tags 与 SparseTFIDF.extract_corpus 计算权重的用时（不包括分词）"""
+    import jieba.analyse
+    from hf_analysis.processing.sparse_tfidf import SparseTFIDF
+    rnd = random.Random(0)
+    words = list(jieba.analyse.TFIDF().idf_freq)[::50]
+    cuts = {}
+    for i in range(num_articles):
+        pieces, length = [], 0
+        while length < article_length:
+            pieces.append(rnd.choice(words))
+            length += len(pieces[-1])
+        cuts["".join(pieces) + str(i)] = pieces + [str(i)]
+
+    class Precut:
+        # both extractors read the same cuts, only the scoring is timed
+        def cut(self, sentence):
+            return iter(cuts[sentence])
+
+    baseline_extractor = jieba.analyse.TFIDF()
+    candidate_extractor = SparseTFIDF()
+    baseline_extractor.tokenizer = candidate_extractor.tokenizer = Precut()
+
+    def baseline():
+        return [baseline_extractor.extract_tags(article, topK=20,
+                                                withWeight=True)
+                for article in cuts]
+
+    def candidate():
+        return candidate_extractor.extract_corpus(cuts, topK=20,
+                                                  withWeight=True)
+
+    baseline_time, expected = _timeit(baseline)
+    candidate_time, result = _timeit(candidate)
+    assert expected == result, "SparseTFIDF 与 jieba TF-IDF 结果不一致！"
+    _report("sparse_tfidf", baseline_time, candidate_time)
+
+
+BENCHMARKS = {
+    "tag_count": bench_tag_count,
+    "import": bench_import,
+    "raster": bench_raster,
+    "binarize": bench_binarize,
+    "excel": bench_excel,
+    "sentences": bench_sentences,
+    "count_matrix": bench_count_matrix,
+    "token_cache": bench_token_cache,
+    "sparse_tfidf": bench_sparse_tfidf,
+}
+
+
+def main(argv: List[str]) -> None:
+    names = argv if len(argv) != 0 else list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            raise SystemExit("未知的测试 {}, 可用的测试: {}".format(
+                name, ", ".join(BENCHMARKS)))
+        BENCHMARKS[name]()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
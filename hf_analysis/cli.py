@@ -0,0 +1,286 @@
+# -*- coding: utf-8 -*-
+
+"""
+无界面的命令行入口，依次运行 预处理 -> 装载数据 -> 抽取词汇 -> 统计分析 -> 输出
+
+使用方法：
+    python -m hf_analysis --config default.json --output result.xlsx
+    python -m hf_analysis --root ./project --index ./index.xlsx \\
+        --set pdf_dpi=400 --set analyze_extractor=TextRank
+"""
+import argparse
+import json
+import sys
+import time
+from os.path import abspath, exists, join
+from typing import Any, Dict, List, Optional, Tuple
+
+from hf_analysis.parameter import *
+from hf_analysis.tracker import ProgressTracker
+
+# the same defaults the ui registers in InfoHandler
+DEFAULT_SETTINGS = {
+    INFO_ACTION_SHOW_STAT_DETAIL: True,
+    INFO_OUTPUT_PATH: None,
+    INFO_PATH_ROOT: "",
+    INFO_PATH_INDEX: "",
+    INFO_PATH_ADDITIONAL_PARM: "",
+    INFO_PDF_ENGINE: PDF_ENGINE_PDFTOPPM,
+    INFO_PDF_FORMAT: "jpg",
+    INFO_PDF_DPI: 300,
+    INFO_OCR_TESSDATA_PATH: TESSDATA_DEFAULT_PATH,
+    INFO_OCR_DEF_LANG: "chi_sim",
+    INFO_ANALYZE_NUM_WANTED: 0,
+    INFO_ANALYZE_EXTRACTOR: TF_IDF,
+    INFO_ANALYZE_ALLOW_POS: DEFAULT_POS,
+    INFO_ANALYZE_SUGGESTION_WORD: [],
+    INFO_ANALYZE_WHITELIST_WORD: [],
+    INFO_ANALYZE_BLACKLIST_WORD: [],
+    INFO_ANALYZE_STAT_ANALYZER: TREND_ANALYZER,
+    INFO_ANALYZE_COUNT_MODE: COUNT_MODE_SUBSTRING,
+}
+
+STAGE_PREPROCESS = "preprocess"
+STAGE_LOAD_DATA = "load_data"
+STAGE_EXTRACTION = "extraction"
+STAGE_ANALYZE = "analyze"
+STAGE_EXPORT = "export"
+
+STAGES = [
+    STAGE_PREPROCESS,
+    STAGE_LOAD_DATA,
+    STAGE_EXTRACTION,
+    STAGE_ANALYZE,
+    STAGE_EXPORT,
+]
+
+
+def load_settings(config_path: Optional[str], tracker) -> Dict[str, Any]:
+    """读取与 default.json 相同格式的配置文件，缺少的配置使用默认值"""
+    settings = dict(DEFAULT_SETTINGS)
+    if config_path is None:
+        if not exists(JSON_PATH):
+            return settings
+        config_path = JSON_PATH
+    with open(abspath(config_path), "r", encoding="utf8") as js:
+        value = json.load(js)
+    for key, v in value.items():
+        if key in settings or key == INFO_ACTION_AUTO_NEXT_STEP:
+            settings[key] = v
+        else:
+            tracker.log("Skipping {}, since it is not registered!".format(key),
+                        tp=TRACKER_LOG_INFO, prt=True)
+    tracker.log("加载配置成功! [config={}]".format(config_path), prt=True)
+    return settings
+
+
+def parse_override(override: str) -> Tuple[str, Any]:
+    """解析 key=value 格式的配置，值按照 JSON 解析，失败时作为字符串"""
+    if "=" not in override:
+        raise ValueError("配置格式错误，应为 key=value [override='{}']".format(
+            override))
+    key, value = override.split("=", 1)
+    try:
+        return key.strip(), json.loads(value)
+    except json.JSONDecodeError:
+        return key.strip(), value
+
+
+def check_settings(settings: Dict[str, Any]) -> None:
+    for key in [INFO_PATH_ROOT, INFO_PATH_INDEX]:
+        if settings[key] is None or len(settings[key]) == 0:
+            raise ValueError("域 {} 不应为空".format(INFO_FIELD_NAME[key]))
+    if settings[INFO_OUTPUT_PATH] is None:
+        raise ValueError("域 {} 不应为 None".format(
+            INFO_FIELD_NAME[INFO_OUTPUT_PATH]))
+    if settings[INFO_ANALYZE_EXTRACTOR] not in EXTRACTOR:
+        raise ValueError("未知的高频词汇抽取器 {}".format(
+            settings[INFO_ANALYZE_EXTRACTOR]))
+    if settings[INFO_ANALYZE_STAT_ANALYZER] not in ANALYZER:
+        raise ValueError("未知的统计处理器 {}".format(
+            settings[INFO_ANALYZE_STAT_ANALYZER]))
+    if settings[INFO_ANALYZE_COUNT_MODE] not in [COUNT_MODE_SUBSTRING,
+                                                 COUNT_MODE_TOKEN]:
+        raise ValueError("未知的词汇计数方式 {}".format(
+            settings[INFO_ANALYZE_COUNT_MODE]))
+
+
+def run_pipeline(settings: Dict[str, Any],
+                 stages: List[str],
+                 tracker,
+                 ocr_worker: int = OCR_WORKER,
+                 extraction_worker: int = EXTRACTION_WORKER,
+                 use_cache: bool = True,
+                 keep_images: bool = KEEP_PAGE_IMAGES,
+                 raster_cache_limit: int = RASTER_CACHE_SIZE_LIMIT) -> \
+        Dict[str, float]:
+    """
+    依次运行各个步骤，返回每个步骤的用时（秒）
+
+    参数列表如下：
+    :param settings: 配置，格式与 default.json 相同
+    :param stages: 需要运行的步骤
+    :param tracker: 追踪器
+    :param ocr_worker: OCR 进程数
+    :param extraction_worker: 抽取关键词的进程数
+    :param use_cache: 是否使用根目录中保存的 OCR 缓存以及各步骤的结果
+    :param keep_images: 是否把 pdf 页面图像写入缓存文件夹
+    :param raster_cache_limit: 页面图像缓存大小上限（字节）
+    """
+    from hf_analysis.processing import load_data, output, preprocess, \
+        word_extraction, word_statistics
+    from hf_analysis.processing.artifact import ArtifactStore
+    store = ArtifactStore(join(settings[INFO_PATH_ROOT], ARTIFACT_PATH)) \
+        if use_cache else None
+    timing = {}
+    articles, sorting, tags, summary, detail = None, None, None, None, None
+    token_counts = None
+    count_tokens = settings[INFO_ANALYZE_COUNT_MODE] == COUNT_MODE_TOKEN
+
+    def timed(stage, func, **kwargs):
+        tracker.log("开始 {}".format(stage), prt=True)
+        start = time.perf_counter()
+        result = func(**kwargs)
+        timing[stage] = time.perf_counter() - start
+        tracker.reset_ticker()
+        tracker.log("结束 {} 用时 : {:.2f}s".format(stage, timing[stage]),
+                    prt=True)
+        return result
+
+    if STAGE_PREPROCESS in stages:
+        timed(STAGE_PREPROCESS, preprocess.process,
+              path_to_index=settings[INFO_PATH_INDEX],
+              path_to_additional_parm=settings[INFO_PATH_ADDITIONAL_PARM],
+              output_folder=settings[INFO_PATH_ROOT],
+              dpi=settings[INFO_PDF_DPI],
+              cov_format=settings[INFO_PDF_FORMAT],
+              engine=settings[INFO_PDF_ENGINE],
+              default_lang=settings[INFO_OCR_DEF_LANG],
+              tessdata_path=settings[INFO_OCR_TESSDATA_PATH],
+              tracker=tracker,
+              ocr_worker=ocr_worker,
+              use_ocr_cache=use_cache,
+              keep_images=keep_images,
+              raster_cache_limit=raster_cache_limit)
+    if STAGE_LOAD_DATA in stages:
+        articles, sorting = timed(STAGE_LOAD_DATA, load_data.prepare_data,
+                                  root_path=settings[INFO_PATH_ROOT],
+                                  index_path=settings[INFO_PATH_INDEX],
+                                  tracker=tracker,
+                                  store=store)
+    if STAGE_EXTRACTION in stages:
+        tags, token_counts = timed(
+            STAGE_EXTRACTION, word_extraction.summarise,
+            data=articles,
+            suggestion_word=settings[INFO_ANALYZE_SUGGESTION_WORD],
+            whitelist_word=settings[INFO_ANALYZE_WHITELIST_WORD],
+            blacklist_word=settings[INFO_ANALYZE_BLACKLIST_WORD],
+            num_wanted=settings[INFO_ANALYZE_NUM_WANTED],
+            extractor=settings[INFO_ANALYZE_EXTRACTOR],
+            tracker=tracker,
+            allowPOS=settings[INFO_ANALYZE_ALLOW_POS],
+            store=store,
+            worker=extraction_worker,
+            snapshot_folder=join(settings[INFO_PATH_ROOT], TEMP_PATH,
+                                 TOKENIZER_SNAPSHOT_PATH)
+            if use_cache else None,
+            count_tokens=count_tokens,
+            token_cache_folder=join(settings[INFO_PATH_ROOT], TEMP_PATH,
+                                    TOKEN_CACHE_PATH)
+            if use_cache else None,
+            idf_path=join(settings[INFO_PATH_ROOT], TEMP_PATH, IDF_STORE_FILE)
+            if use_cache else None)
+    if STAGE_ANALYZE in stages:
+        summary, detail = timed(
+            STAGE_ANALYZE, word_statistics.analyze,
+            segment=tags,
+            articles=articles,
+            sorting=sorting,
+            tracker=tracker,
+            statistics_analyzer=settings[INFO_ANALYZE_STAT_ANALYZER],
+            store=store,
+            token_counts=token_counts)
+    if STAGE_EXPORT in stages:
+        timed(STAGE_EXPORT, output.write_excel,
+              path=settings[INFO_OUTPUT_PATH],
+              total_summary=summary,
+              detail_summary=detail,
+              sorting=sorting,
+              tracker=tracker,
+              show_detail=settings[INFO_ACTION_SHOW_STAT_DETAIL])
+    return timing
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m hf_analysis",
+        description="高频词汇分析（无界面模式）")
+    parser.add_argument("-c", "--config", default=None,
+                        help="配置文件，格式与 default.json 相同 "
+                             "（默认: {}）".format(JSON_PATH))
+    parser.add_argument("--root", default=None, help="根目录")
+    parser.add_argument("--index", default=None, help="索引文件")
+    parser.add_argument("--additional-parm", default=None, help="附加参数文件")
+    parser.add_argument("-o", "--output", default=None, help="输出的 excel 文件")
+    parser.add_argument("--set", dest="overrides", action="append", default=[],
+                        metavar="KEY=VALUE",
+                        help="覆盖配置文件中的配置，值按照 JSON 解析，可重复使用")
+    parser.add_argument("--skip-preprocess", action="store_true",
+                        help="跳过预处理，直接使用根目录 data 文件夹中的数据")
+    parser.add_argument("--ocr-worker", type=int, default=OCR_WORKER,
+                        help="OCR 进程数 （默认: {}）".format(OCR_WORKER))
+    parser.add_argument("--extraction-worker", type=int,
+                        default=EXTRACTION_WORKER,
+                        help="抽取关键词的进程数 （默认: {}）".format(
+                            EXTRACTION_WORKER))
+    parser.add_argument("--keep-images", action="store_true",
+                        help="把 pdf 页面图像写入缓存文件夹，默认只保存在内存中")
+    parser.add_argument("--raster-cache-limit", type=int,
+                        default=RASTER_CACHE_SIZE_LIMIT // (1024 * 1024),
+                        metavar="MB",
+                        help="页面图像缓存大小上限，单位 MB，缓存文件夹可以通过环境变量 "
+                             "{} 在多个项目之间共享".format(RASTER_CACHE_ENV))
+    parser.add_argument("--no-cache", action="store_true",
+                        help="不使用 OCR 缓存以及上次保存的步骤结果，全部重新计算")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    tracker = ProgressTracker(enable_print_out=True)
+    try:
+        settings = load_settings(args.config, tracker)
+        for override in args.overrides:
+            key, value = parse_override(override)
+            if key not in settings:
+                raise ValueError("未知的配置 {}".format(key))
+            settings[key] = value
+        for key, value in [(INFO_PATH_ROOT, args.root),
+                           (INFO_PATH_INDEX, args.index),
+                           (INFO_PATH_ADDITIONAL_PARM, args.additional_parm),
+                           (INFO_OUTPUT_PATH, args.output)]:
+            if value is not None:
+                settings[key] = value
+        check_settings(settings)
+        stages = [s for s in STAGES
+                  if not (args.skip_preprocess and s == STAGE_PREPROCESS)]
+        timing = run_pipeline(settings, stages, tracker,
+                              ocr_worker=args.ocr_worker,
+                              extraction_worker=args.extraction_worker,
+                              use_cache=not args.no_cache,
+                              keep_images=args.keep_images,
+                              raster_cache_limit=args.raster_cache_limit *
+                              1024 * 1024)
+    except ValueError as v:
+        tracker.log("处理由于 参数错误 终止！ [error='{}']".format(str(v)),
+                    tp=TRACKER_LOG_ERROR, prt=True, exc_info=v)
+        return 2
+    print("=" * FORMAT_LENGTH)
+    for stage in stages:
+        print("{:<12s} {:>10.2f}s".format(stage, timing[stage]))
+    print("{:<12s} {:>10.2f}s".format("total", sum(timing.values())))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,18 +1,64 @@
 # -*- coding: utf-8 -*-
 
-import subprocess
 import platform
+import shutil
+import subprocess
+from functools import lru_cache
 from logging import CRITICAL, DEBUG, ERROR, INFO, NOTSET, WARNING
-
-import jieba.analyse
+from os import environ
+from os.path import dirname, isdir
+from typing import Optional
 
 from hf_analysis.processing.word_statistics import TREND_FLAG_DECLINE, \
     TREND_FLAG_INCREASE, TREND_FLAG_STABLE, TrendAnalyzer
 
 USABLE_THREAD = 4
+# number of OCR worker processes, each worker owns its own tesseract api
+OCR_WORKER = USABLE_THREAD
+# initialised tesseract apis kept by each OCR worker, one per language
+OCR_API_POOL_SIZE = 3
+# pages converted by one poppler call, and the most converted pages waiting
+# for recognition
+RASTER_BATCH_SIZE = USABLE_THREAD
+RASTER_QUEUE_DEPTH = 2 * USABLE_THREAD
+# write the converted pdf pages to the temp folder instead of keeping them
+# in memory
+KEEP_PAGE_IMAGES = False
+# number of keyword extraction worker processes, and the most articles
+# sent to a worker at once
+EXTRACTION_WORKER = USABLE_THREAD
+EXTRACTION_CHUNK_SIZE = 4
+# articles scored at once by an extractor with extract_corpus in the
+# current process
+CORPUS_BATCH_SIZE = 256
+# number of processes reading and parsing text/docx/xlsx files
+INGEST_WORKER = USABLE_THREAD
+
+# environment variable that overrides the poppler path
+POPPLER_PATH_ENV = "POPPLER_PATH"
+
+
+@lru_cache(maxsize=None)
+def get_poppler_path() -> Optional[str]:
+    """
+    查找 poppler 的 bin 目录，只会在第一次扫描 pdf 时查找一次
+
+    查找顺序为：环境变量 POPPLER_PATH, PATH 中的 pdftoppm, brew --prefix poppler
+    返回 None 时 pdf2image 会直接使用 PATH
+    """
+    if environ.get(POPPLER_PATH_ENV):
+        return environ[POPPLER_PATH_ENV]
+    pdftoppm = shutil.which("pdftoppm")
+    if pdftoppm is not None:
+        return dirname(pdftoppm)
+    try:
+        prefix = subprocess.check_output(
+            ['brew', '--prefix', 'poppler'], stderr=subprocess.DEVNULL)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    path = prefix.decode().strip() + "/bin"
+    return path if isdir(path) else None
 
-# get poppler path
-POPPLER_PATH = subprocess.check_output(['brew', '--prefix', 'poppler']).decode().strip() + "/bin"
 
 ICON_PNG_PATH = "./resource/icon_16x16@2x.png"
 ICON_ICN_PATH = "./resource/icon.icns"
@@ -21,9 +67,20 @@ DEVICE_OS = platform.system()
 
 ADDI_PARM_CROP = "CROP"
 ADDI_PARM_LANG = "LANG"
+ADDI_PARM_BINARIZE = "BINARIZE"
+
+# binarization methods of the BINARIZE additional parameter
+BINARIZE_FIXED = "FIXED"
+BINARIZE_OTSU = "OTSU"
+BINARIZE_SAUVOLA = "SAUVOLA"
+SAUVOLA_DEFAULT_WINDOW = 25
+SAUVOLA_DEFAULT_K = 0.2
 
 DATA_PREFIX = "data"
 
+# characters that end a sentence in the loaded data
+SENTENCE_TERMINATORS = "。！？.!?；"
+
 TREND_NAME = {
     TREND_FLAG_STABLE: "平稳",
     TREND_FLAG_DECLINE: "下降",
@@ -35,6 +92,9 @@ TESSDATA_DEFAULT_PATH = "./tessdata/default/."
 TESSDATA_BEST_PATH = "./tessdata/best/."
 TESSDATA_FAST_PATH = "./tessdata/fast/."
 FORMAT_LENGTH = 50
+# pixels darker than this become black before recognition
+BINARIZE_THRESHOLD = 180
+DEFAULT_BINARIZE = (BINARIZE_FIXED, BINARIZE_THRESHOLD)
 
 DEFAULT_SPACING = 5
 
@@ -42,18 +102,62 @@ DEFAULT_SPACING = 5
 TEMP_PATH = "temp"
 DATA_PATH = "data"
 RESOURCE_PATH = "resource"
+# ocr result cache, inside the temp folder
+OCR_CACHE_PATH = "ocr_cache"
+OCR_CACHE_SIZE_LIMIT = 256 * 1024 * 1024
+# converted pdf pages kept with keep_images, inside the temp folder unless
+# the environment variable points to a folder shared by several projects
+RASTER_CACHE_PATH = "raster_cache"
+RASTER_CACHE_ENV = "HF_ANALYSIS_RASTER_CACHE"
+RASTER_CACHE_SIZE_LIMIT = 4 * 1024 * 1024 * 1024
+# customised jieba dictionary snapshots, inside the temp folder
+TOKENIZER_SNAPSHOT_PATH = "jieba_snapshot"
+TOKENIZER_SNAPSHOT_KEEP = 3
+# jieba cuts of every article, inside the temp folder
+TOKEN_CACHE_PATH = "token_cache"
+TOKEN_CACHE_SIZE_LIMIT = 512 * 1024 * 1024
+# document frequencies of the loaded articles, inside the temp folder
+IDF_STORE_FILE = "corpus_idf.pkl"
+# stage results, inside the root folder
+ARTIFACT_PATH = "artifact"
+ARTIFACT_LOAD_DATA = "load_data"
+ARTIFACT_EXTRACTION = "extraction"
+ARTIFACT_ANALYZE = "analyze"
+ARTIFACT_TOKEN_COUNTS = "token_counts"
 
 # json path
 JSON_PATH = "./default.json"
 
 # available extractor
 TF_IDF = "tf-idf"
+TF_IDF_CORPUS = "tf-idf-corpus"
+TF_IDF_SPARSE = "tf-idf-sparse"
 TEXT_RANK = "TextRank"
 
-# 可用的提取器
+
+def _tf_idf_extractor():
+    import jieba.analyse
+    return jieba.analyse.TFIDF()
+
+
+def _sparse_tf_idf_extractor():
+    from hf_analysis.processing.sparse_tfidf import SparseTFIDF
+    return SparseTFIDF()
+
+
+def _text_rank_extractor():
+    import jieba.analyse
+    return jieba.analyse.TextRank()
+
+
+# 可用的提取器, 值为创建提取器的函数, jieba 在第一次抽取词汇时才会被导入
 EXTRACTOR = {
-    TF_IDF: jieba.analyse.TFIDF,
-    TEXT_RANK: jieba.analyse.TextRank,
+    TF_IDF: _tf_idf_extractor,
+    # the idf table is computed from the loaded articles by summarise
+    TF_IDF_CORPUS: _tf_idf_extractor,
+    # scores a batch of articles at once through extract_corpus
+    TF_IDF_SPARSE: _sparse_tf_idf_extractor,
+    TEXT_RANK: _text_rank_extractor,
 }
 
 # available extractor
@@ -63,6 +167,11 @@ ANALYZER = {
     TREND_ANALYZER: TrendAnalyzer
 }
 
+# how the analyzer counts a tag in an article, as a substring of the text or
+# as a token of the extraction's segmentation
+COUNT_MODE_SUBSTRING = "substring"
+COUNT_MODE_TOKEN = "token"
+
 # tracker constant
 TRACKER_LOG = "tracker_log"
 TRACKER_TICK = "tracker_tick"
@@ -98,6 +207,7 @@ INFO_INDEX_MAP = "index_map"
 INFO_ARTICLES = "articles"
 INFO_SORTING = "sorting"
 INFO_TAGS = "tags"
+INFO_TOKEN_COUNTS = "token_counts"
 INFO_ANALYZED_SUMMARY = "analyzed_summary"
 INFO_ANALYZED_DETAIL = "analyzed_detail"
 
@@ -111,6 +221,7 @@ INFO_ANALYZE_BLACKLIST_WORD = "analyze_blacklist"
 INFO_ANALYZE_NUM_WANTED = "analyze_num_wanted"
 INFO_ANALYZE_EXTRACTOR = "analyze_extractor"
 INFO_ANALYZE_STAT_ANALYZER = "analyze_stat_analyzer"
+INFO_ANALYZE_COUNT_MODE = "analyze_count_mode"
 
 INFO_OUTPUT_PATH = "output_path"
 
@@ -176,6 +287,7 @@ INFO_FIELD_NAME = {
     INFO_ANALYZE_EXTRACTOR: "高频词汇抽取器",
 
     INFO_ANALYZE_STAT_ANALYZER: "统计处理器",
+    INFO_ANALYZE_COUNT_MODE: "词汇计数方式",
     INFO_ACTION_SHOW_STAT_DETAIL: "输出统计细节",
 
     INFO_OUTPUT_PATH: "输出目录",
@@ -185,3 +297,5 @@ THREAD_VALUE_ERROR = "value_error"
 THREAD_OTHER_ERROR = "other_error"
 
 WIDTH_RATIO = 2.1
+# rows sampled for the column width of a streamed excel export
+EXPORT_WIDTH_SAMPLE = 1000
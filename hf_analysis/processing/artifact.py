@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+
+"""
+步骤结果储存模块，记录每个步骤输入的指纹，输入没有变化时直接使用上次的结果
+"""
+import hashlib
+import json
+import pickle
+from os import makedirs, replace
+from os.path import exists, join
+from typing import Any, Iterable, Optional
+
+# bump this when the layout of any stored result changes
+ARTIFACT_VERSION = 4
+
+PICKLE_PROTOCOL = 4
+
+
+def _canonical(value) -> Any:
+    # sets have no order, anything else json can not encode is named
+    if isinstance(value, (set, frozenset)):
+        return sorted(value, key=repr)
+    return repr(value)
+
+
+def fingerprint(*values) -> str:
+    """
+    计算数据的指纹，相等的数据指纹相同
+
+    数据编码为键排序的 JSON，不使用 pickle：pickle 的结果与对象是否为同一个对象有关
+    """
+    digest = hashlib.sha1()
+    digest.update(str(ARTIFACT_VERSION).encode("utf8"))
+    for value in values:
+        digest.update(json.dumps(value, sort_keys=True, ensure_ascii=False,
+                                 default=_canonical).encode("utf8"))
+    return digest.hexdigest()
+
+
+def file_fingerprint(paths: Iterable[str]) -> str:
+    """计算多个文件内容的指纹"""
+    digest = hashlib.sha1()
+    for path in paths:
+        digest.update(path.encode("utf8"))
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ArtifactStore:
+    """
+    保存在文件夹中的步骤结果，每个步骤一个 pickle 文件
+
+    成员变量如下：
+    === 私有变量 ===
+    _folder: 储存文件夹
+    """
+
+    def __init__(self, folder: str) -> None:
+        """初始化 ArtifactStore"""
+        self._folder = folder
+
+    def _path(self, stage: str) -> str:
+        return join(self._folder, "{}.pkl".format(stage))
+
+    def load(self, stage: str, stage_fingerprint: Optional[str] = None) -> \
+            Optional[Any]:
+        """
+        读取步骤结果
+
+        参数列表如下：
+        :param stage: 步骤名
+        :param stage_fingerprint: 输入的指纹，与保存时的指纹不同时返回 None，
+                                  为 None 时不检查指纹
+        """
+        path = self._path(stage)
+        if not exists(path):
+            return None
+        try:
+            with open(path, "rb") as f:
+                version, saved_fingerprint, value = pickle.load(f)
+        except Exception:
+            # a broken artifact is the same as no artifact
+            return None
+        if version != ARTIFACT_VERSION:
+            return None
+        if stage_fingerprint is not None and \
+                saved_fingerprint != stage_fingerprint:
+            return None
+        return value
+
+    def save(self, stage: str, value: Any,
+             stage_fingerprint: Optional[str] = None) -> None:
+        """保存步骤结果"""
+        if not exists(self._folder):
+            makedirs(self._folder)
+        path = self._path(stage)
+        temp_path = path + ".tmp"
+        with open(temp_path, "wb") as f:
+            pickle.dump((ARTIFACT_VERSION, stage_fingerprint, value), f,
+                        protocol=PICKLE_PROTOCOL)
+        replace(temp_path, path)
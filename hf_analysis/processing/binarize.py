@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+
+"""
+页面二值化模块，识别之前把灰度页面转换为黑白图像
+
+支持的方法（附加参数 BINARIZE）：
+    FIXED/阈值          暗于阈值的像素变为黑色
+    OTSU                根据页面的灰度直方图自动选择全局阈值
+    SAUVOLA/窗口/k      根据每个像素周围窗口的均值与标准差选择局部阈值
+"""
+from typing import List, Tuple
+
+from hf_analysis.parameter import BINARIZE_FIXED, BINARIZE_OTSU, \
+    BINARIZE_SAUVOLA
+
+# dynamic range of the standard deviation in sauvola's formula
+SAUVOLA_R = 128.0
+
+
+def binarize(img, method: Tuple):
+    """
+    把灰度（L 模式）图像转换为黑白（1 模式）图像
+
+    参数列表如下：
+    :param img: 灰度 PIL 图像
+    :param method: (BINARIZE_FIXED, 阈值), (BINARIZE_OTSU,) 或者
+                   (BINARIZE_SAUVOLA, 窗口大小, k)
+    """
+    if method[0] == BINARIZE_FIXED:
+        return img.point(_threshold_lut(method[1]), "1")
+    if method[0] == BINARIZE_OTSU:
+        return img.point(_threshold_lut(otsu_threshold(img.histogram())), "1")
+    if method[0] == BINARIZE_SAUVOLA:
+        return _sauvola(img, method[1], method[2])
+    raise ValueError("未知的二值化方法 {}".format(method[0]))
+
+
+def _threshold_lut(threshold: int) -> List[int]:
+    # a lookup table is applied in c, unlike a python lambda
+    threshold = max(0, min(256, int(threshold)))
+    return [0] * threshold + [255] * (256 - threshold)
+
+
+def otsu_threshold(histogram: List[int]) -> int:
+    """根据 256 级灰度直方图计算 Otsu 阈值，暗于阈值的像素为前景"""
+    total = sum(histogram)
+    if total == 0:
+        return 128
+    sum_all = sum(i * h for i, h in enumerate(histogram))
+    sum_back, weight_back = 0, 0
+    best, best_variance = 0, -1.0
+    for i, h in enumerate(histogram):
+        weight_back += h
+        if weight_back == 0:
+            continue
+        weight_fore = total - weight_back
+        if weight_fore == 0:
+            break
+        sum_back += i * h
+        mean_back = sum_back / weight_back
+        mean_fore = (sum_all - sum_back) / weight_fore
+        variance = weight_back * weight_fore * (mean_back - mean_fore) ** 2
+        if variance > best_variance:
+            best, best_variance = i, variance
+    # pixels up to and including the best level belong to the background
+    # class of the split, so they are the dark ones
+    return best + 1
+
+
+def _sauvola(img, window: int, k: float):
+    import numpy as np
+    from PIL import Image
+    pixels = np.asarray(img, dtype=np.float64)
+    height, width = pixels.shape
+    half = max(int(window), 1) // 2
+    # integral images with a zero row and column in front
+    integral = np.zeros((height + 1, width + 1))
+    integral[1:, 1:] = pixels.cumsum(axis=0).cumsum(axis=1)
+    integral_sq = np.zeros((height + 1, width + 1))
+    integral_sq[1:, 1:] = (pixels * pixels).cumsum(axis=0).cumsum(axis=1)
+    # window bounds of every pixel, clipped at the border
+    top = np.clip(np.arange(height) - half, 0, height)[:, None]
+    bottom = np.clip(np.arange(height) + half + 1, 0, height)[:, None]
+    left = np.clip(np.arange(width) - half, 0, width)[None, :]
+    right = np.clip(np.arange(width) + half + 1, 0, width)[None, :]
+    area = (bottom - top) * (right - left)
+
+    def window_sum(table):
+        return table[bottom, right] - table[top, right] - \
+            table[bottom, left] + table[top, left]
+
+    mean = window_sum(integral) / area
+    variance = window_sum(integral_sq) / area - mean * mean
+    std = np.sqrt(np.maximum(variance, 0))
+    threshold = mean * (1 + k * (std / SAUVOLA_R - 1))
+    return Image.fromarray(pixels > threshold)
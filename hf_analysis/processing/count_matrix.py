@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+
+"""
+词汇出现次数矩阵模块，用一个 int32 矩阵代替 { 类别: { 词汇: { 文章: 次数 } } } 的嵌套字典
+"""
+from collections.abc import Mapping
+from typing import Dict, Iterable, Iterator, List
+
+
+class CountMatrix(Mapping):
+    """
+    词汇 x 文章 的出现次数矩阵，每个类别的文章占据连续的几列
+
+    作为 { 类别: { 词汇: { 文章: 次数 } } } 的只读字典使用，
+    读取时才创建视图，不会生成嵌套字典
+
+    成员变量如下：
+    === 私有变量 ===
+    _tags: 词汇列表，行号即为其在列表中的位置
+    _tag_index: { 词汇: 行号 }
+    _columns: { 类别: (起始列, { 文章: 类别内的列号 }) }，按类别顺序排列
+    _matrix: 词汇 x 文章 的 int32 矩阵
+    """
+    _tags: List[str]
+    _tag_index: Dict[str, int]
+    _columns: Dict[str, tuple]
+
+    def __init__(self, tags: Iterable[str],
+                 articles: Dict[str, Iterable[str]]) -> None:
+        """
+        初始化 CountMatrix，所有次数为 0
+
+        参数列表如下：
+        :param tags: 所有的词汇
+        :param articles: { 类别: [文章名] }，类别的顺序即为列的顺序
+        """
+        import numpy as np
+        self._tags = list(tags)
+        self._tag_index = {tag: row for row, tag in enumerate(self._tags)}
+        self._columns = {}
+        start = 0
+        for category, names in articles.items():
+            index = {name: col for col, name in enumerate(names)}
+            self._columns[category] = (start, index)
+            start += len(index)
+        self._matrix = np.zeros((len(self._tags), start), dtype=np.int32)
+
+    @property
+    def tags(self) -> List[str]:
+        """返回所有的词汇，顺序与矩阵的行相同"""
+        return list(self._tags)
+
+    def set_counts(self, category: str, name: str,
+                   counts: List[int]) -> None:
+        """设置一篇文章的出现次数，counts 的顺序与 tags 相同"""
+        start, index = self._columns[category]
+        self._matrix[:, start + index[name]] = counts
+
+    def set_count_map(self, category: str, name: str,
+                      counts: Dict[str, int]) -> None:
+        """设置一篇文章的出现次数，counts 为 { 词汇: 次数 }，不在其中的词汇为 0"""
+        start, index = self._columns[category]
+        col = start + index[name]
+        for tag, count in counts.items():
+            row = self._tag_index.get(tag)
+            if row is not None:
+                self._matrix[row, col] = count
+
+    def totals(self):
+        """返回 词汇 x 类别 的总出现次数矩阵，类别的顺序与初始化时相同"""
+        import numpy as np
+        totals = np.zeros((len(self._tags), len(self._columns)),
+                          dtype=np.int64)
+        for col, (start, index) in enumerate(self._columns.values()):
+            # summing a slice in place, without an int64 copy of the matrix
+            self._matrix[:, start:start + len(index)].sum(
+                axis=1, dtype=np.int64, out=totals[:, col])
+        return totals
+
+    def __getitem__(self, category: str) -> "CategoryCounts":
+        start, index = self._columns[category]
+        return CategoryCounts(
+            self._matrix[:, start:start + len(index)], self._tag_index, index)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._columns)
+
+    def __len__(self) -> int:
+        return len(self._columns)
+
+
+class CategoryCounts(Mapping):
+    """
+    一个类别的 { 词汇: { 文章: 次数 } } 视图
+
+    成员变量如下：
+    === 私有变量 ===
+    _block: 矩阵中属于这个类别的几列
+    _tag_index: { 词汇: 行号 }
+    _article_index: { 文章: 列号 }
+    """
+
+    def __init__(self, block, tag_index: Dict[str, int],
+                 article_index: Dict[str, int]) -> None:
+        self._block = block
+        self._tag_index = tag_index
+        self._article_index = article_index
+
+    def __getitem__(self, tag: str) -> "ArticleCounts":
+        return ArticleCounts(self._block[self._tag_index[tag]],
+                             self._article_index)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._tag_index)
+
+    def __len__(self) -> int:
+        return len(self._tag_index)
+
+
+class ArticleCounts(Mapping):
+    """
+    一个词汇在一个类别中的 { 文章: 次数 } 视图
+
+    成员变量如下：
+    === 私有变量 ===
+    _row: 词汇在这个类别中的一行
+    _article_index: { 文章: 列号 }
+    """
+
+    def __init__(self, row, article_index: Dict[str, int]) -> None:
+        self._row = row
+        self._article_index = article_index
+
+    def __getitem__(self, name: str) -> int:
+        return int(self._row[self._article_index[name]])
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._article_index)
+
+    def __len__(self) -> int:
+        return len(self._article_index)
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+
+"""
+语料库 IDF 模块，根据装载的文章计算每个词汇的逆文档频率，代替 jieba 自带的通用 IDF 表
+"""
+import hashlib
+import pickle
+from array import array
+from math import log
+from os import makedirs, replace
+from os.path import dirname, exists
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# bump this when the layout of the store changes
+STORE_VERSION = 1
+
+PICKLE_PROTOCOL = 4
+
+
+def article_digest(article: str) -> str:
+    """文章内容的哈希"""
+    return hashlib.sha1(article.encode("utf8")).hexdigest()
+
+
+def corpus_fingerprint(digests: Iterable[str], cut_key: str) -> str:
+    """语料库的指纹，与文章的顺序无关"""
+    digest = hashlib.sha1()
+    digest.update(repr((STORE_VERSION, cut_key)).encode("utf8"))
+    for d in sorted(set(digests)):
+        digest.update(d.encode("utf8"))
+    return digest.hexdigest()
+
+
+class IdfStore:
+    """
+    语料库的文档频率（DF）表，记录每篇文章（按内容哈希）包含的词汇，
+    增加或者删除文章时只需要处理改变了的文章，保存为一个二进制文件；
+    内容相同的文章只计为一篇，重复装载的文章不会降低其中词汇的 IDF
+
+    文档频率与分词结果有关，所以分词方式（cut_key）改变时从空表开始
+
+    成员变量如下：
+    === 私有变量 ===
+    _path: 保存的文件，为 None 时不保存
+    _cut_key: 分词方式的键，包括词典快照的键以及是否标注词性
+    _vocabulary: 词汇列表，词汇编号即为其在列表中的位置
+    _index: { 词汇: 编号 }
+    _documents: { 文章哈希: 文章包含的词汇编号（uint32 数组） }
+    _df: 每个词汇出现在多少篇文章中（uint32 数组）
+    _dirty: 是否需要保存
+    """
+    _vocabulary: List[str]
+    _index: Dict[str, int]
+    _documents: Dict[str, array]
+
+    def __init__(self, path: Optional[str], cut_key: str) -> None:
+        """初始化 IdfStore，读取保存的文件"""
+        self._path = path
+        self._cut_key = cut_key
+        self._vocabulary = []
+        self._index = {}
+        self._documents = {}
+        self._df = array("I")
+        self._dirty = False
+        if path is not None and exists(path):
+            self._read(path)
+
+    def _read(self, path: str) -> None:
+        try:
+            with open(path, "rb") as f:
+                version, cut_key, vocabulary, documents, df = \
+                    pickle.load(f)
+        except Exception:
+            # a broken store is the same as an empty one
+            return
+        if version != STORE_VERSION or cut_key != self._cut_key:
+            return
+        self._vocabulary = vocabulary
+        self._index = {word: i for i, word in enumerate(vocabulary)}
+        self._documents = documents
+        self._df = df
+
+    def missing(self, digests: Iterable[str]) -> List[str]:
+        """返回还没有记录的文章哈希"""
+        return [d for d in dict.fromkeys(digests) if d not in self._documents]
+
+    def add(self, digest: str, words: Iterable[str]) -> None:
+        """记录一篇文章包含的词汇"""
+        if digest in self._documents:
+            return
+        ids = array("I")
+        for word in set(words):
+            i = self._index.get(word)
+            if i is None:
+                i = len(self._vocabulary)
+                self._index[word] = i
+                self._vocabulary.append(word)
+                self._df.append(0)
+            ids.append(i)
+            self._df[i] += 1
+        self._documents[digest] = ids
+        self._dirty = True
+
+    def retain(self, digests: Iterable[str]) -> int:
+        """只保留 digests 中的文章，返回移除的文章个数"""
+        keep = set(digests)
+        removed = [d for d in self._documents if d not in keep]
+        for d in removed:
+            for i in self._documents.pop(d):
+                self._df[i] -= 1
+        if len(removed) != 0:
+            self._dirty = True
+        return len(removed)
+
+    def fingerprint(self) -> str:
+        """当前语料库的指纹"""
+        return corpus_fingerprint(self._documents, self._cut_key)
+
+    def idf(self) -> Tuple[Dict[str, float], float]:
+        """
+        返回 ({ 词汇: IDF }, IDF 中位数)，格式与 jieba 的 IDFLoader.get_idf 相同
+
+        IDF = ln((1 + N) / (1 + DF)) + 1，出现在所有文章中的词汇 IDF 为 1 而不是 0
+        """
+        n = len(self._documents)
+        idf_freq = {
+            word: log((1 + n) / (1 + df)) + 1
+            for word, df in zip(self._vocabulary, self._df) if df != 0
+        }
+        if len(idf_freq) == 0:
+            return idf_freq, 1.0
+        values = sorted(idf_freq.values())
+        return idf_freq, values[len(values) // 2]
+
+    def save(self) -> None:
+        """有改变时保存，词汇表中不再出现的词汇在保存时移除"""
+        if self._path is None or not self._dirty:
+            return
+        self._compact()
+        folder = dirname(self._path)
+        if folder != "" and not exists(folder):
+            makedirs(folder)
+        temp_path = self._path + ".tmp"
+        with open(temp_path, "wb") as f:
+            pickle.dump((STORE_VERSION, self._cut_key,
+                         self._vocabulary, self._documents, self._df),
+                        f, protocol=PICKLE_PROTOCOL)
+        replace(temp_path, self._path)
+        self._dirty = False
+
+    def _compact(self) -> None:
+        if all(df != 0 for df in self._df):
+            return
+        remap = {}
+        vocabulary, df = [], array("I")
+        for i, (word, count) in enumerate(zip(self._vocabulary, self._df)):
+            if count != 0:
+                remap[i] = len(vocabulary)
+                vocabulary.append(word)
+                df.append(count)
+        self._vocabulary = vocabulary
+        self._index = {word: i for i, word in enumerate(vocabulary)}
+        self._df = df
+        self._documents = {
+            d: array("I", (remap[i] for i in ids))
+            for d, ids in self._documents.items()
+        }
@@ -1,14 +1,15 @@
 # -*- coding: utf-8 -*-
 
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from math import isnan
 from os import listdir
 from os.path import exists, isfile, join, splitext
-from re import findall
-from typing import Dict, List, Tuple
-
-import pandas as pd
-from docx2txt import process
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
 from hf_analysis.parameter import *
+from hf_analysis.processing.artifact import ArtifactStore, file_fingerprint
 
 
 def extract_content(path: str) -> str:
@@ -27,15 +28,208 @@ def extract_text(path: str) -> str:
         return f.read()
 
 
+def iter_lines(path: str) -> Iterator[str]:
+    """逐行读取一个文件，纯文本文件不会一次读入整个文件"""
+    _, extension = splitext(path)
+    if extension in [".docx", ".doc", ".xlsx", ".xls"]:
+        yield from extract_content(path).split("\n")
+        return
+    with open(path, encoding="utf8") as f:
+        for line in f:
+            yield line.rstrip("\n")
+
+
 def extract_docx(path: str) -> str:
+    from docx2txt import process
     text = process(path)
     return "\n".join(str(t) for t in text)
 
 
 def extract_excel(path: str) -> str:
-    df = pd.read_excel(path)
+    """读取 excel 第一个工作表中所有非空的单元格，每行一行"""
     return "\n".join(
-        " ".join(str(i) for i in row) for row in df.iterrows())
+        " ".join(str(cell) for cell in row if not is_empty_cell(cell))
+        for row in read_excel_rows(path, skip_header=False))
+
+
+# namespaces of the xlsx xml parts
+_XLSX_MAIN = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_XLSX_REL = "{http://schemas.openxmlformats.org/officeDocument/2006/" \
+            "relationships}"
+_XLSX_PKG_REL = "{http://schemas.openxmlformats.org/package/2006/" \
+                "relationships}"
+
+
+def read_excel_rows(path: str, skip_header: bool = True) -> Iterator[list]:
+    """
+    逐行读取 excel 第一个工作表的单元格值，不经过 pandas
+
+    与 pd.read_excel 相同，默认跳过作为表头的第一行；
+    空单元格为 None，整数值为 int，以 ISO 8601 保存的日期为 datetime，
+    完全为空的行会被跳过，每行至少有表头的长度
+    """
+    _, extension = splitext(path)
+    rows = _read_xls_rows(path) if extension == ".xls" else \
+        _read_xlsx_rows(path)
+    width = 0
+    for i, row in enumerate(rows):
+        if i == 0:
+            width = len(row)
+            if skip_header:
+                continue
+        if all(is_empty_cell(cell) for cell in row):
+            continue
+        yield row + [None] * (width - len(row))
+
+
+def _read_xls_rows(path: str) -> Iterator[list]:
+    import xlrd
+    book = xlrd.open_workbook(path, on_demand=True)
+    try:
+        sheet = book.sheet_by_index(0)
+        for r in range(sheet.nrows):
+            yield [_xls_value(cell) for cell in sheet.row(r)]
+    finally:
+        book.release_resources()
+
+
+def _xls_value(cell):
+    import xlrd
+    if cell.ctype in [xlrd.XL_CELL_EMPTY, xlrd.XL_CELL_BLANK]:
+        return None
+    if cell.ctype == xlrd.XL_CELL_NUMBER:
+        return _number(cell.value)
+    if cell.ctype == xlrd.XL_CELL_BOOLEAN:
+        return bool(cell.value)
+    return cell.value
+
+
+def _number(value: float):
+    return int(value) if float(value).is_integer() else float(value)
+
+
+def _read_xlsx_rows(path: str) -> Iterator[list]:
+    import zipfile
+    from xml.etree.ElementTree import fromstring, iterparse
+    with zipfile.ZipFile(path) as archive:
+        # find the part of the first sheet
+        workbook = fromstring(archive.read("xl/workbook.xml"))
+        sheet_id = workbook.find(
+            "{0}sheets/{0}sheet".format(_XLSX_MAIN)).get(_XLSX_REL + "id")
+        rels = fromstring(archive.read("xl/_rels/workbook.xml.rels"))
+        target = next(r.get("Target") for r in rels.iter(
+            _XLSX_PKG_REL + "Relationship") if r.get("Id") == sheet_id)
+        sheet_path = target.lstrip("/") if target.startswith("/") else \
+            "xl/" + target
+        shared = []
+        if "xl/sharedStrings.xml" in archive.namelist():
+            with archive.open("xl/sharedStrings.xml") as f:
+                for _, elem in iterparse(f):
+                    if elem.tag == _XLSX_MAIN + "si":
+                        shared.append(_xlsx_text(elem))
+                        elem.clear()
+        row_tag, cell_tag = _XLSX_MAIN + "row", _XLSX_MAIN + "c"
+        columns = {}
+        with archive.open(sheet_path) as f:
+            row_number = 0
+            for _, elem in iterparse(f):
+                if elem.tag != row_tag:
+                    continue
+                number = int(elem.get("r", row_number + 1))
+                # rows without any cell are not stored
+                for _ in range(row_number + 1, number):
+                    yield []
+                row_number = number
+                row = []
+                for cell in elem:
+                    if cell.tag != cell_tag:
+                        continue
+                    col = _xlsx_column(cell.get("r"), len(row), columns)
+                    row += [None] * (col - len(row))
+                    row.append(_xlsx_value(cell, shared))
+                yield row
+                elem.clear()
+
+
+def _xlsx_text(elem) -> str:
+    # rich text has several runs, phonetic hints (rPh) are not part of it
+    parts = []
+    for child in elem:
+        if child.tag == _XLSX_MAIN + "t":
+            parts.append(child.text or "")
+        elif child.tag == _XLSX_MAIN + "r":
+            t = child.find(_XLSX_MAIN + "t")
+            if t is not None:
+                parts.append(t.text or "")
+    return "".join(parts)
+
+
+def _xlsx_column(ref: Optional[str], default: int,
+                 columns: Dict[str, int]) -> int:
+    """单元格位置（例如 AB12）的列号，columns 缓存已经计算过的列"""
+    if ref is None:
+        return default
+    letters = ref.rstrip("0123456789")
+    col = columns.get(letters)
+    if col is None:
+        col = 0
+        for ch in letters:
+            col = col * 26 + ord(ch.upper()) - ord("A") + 1
+        col -= 1
+        columns[letters] = col
+    return col
+
+
+def _xlsx_value(elem, shared: List[str]):
+    tp = elem.get("t", "n")
+    if tp == "inlineStr":
+        inline = elem.find(_XLSX_MAIN + "is")
+        return None if inline is None else _xlsx_text(inline)
+    v = elem.find(_XLSX_MAIN + "v")
+    if v is None or v.text is None:
+        return None
+    if tp == "s":
+        return shared[int(v.text)]
+    if tp == "b":
+        return v.text == "1"
+    if tp in ["str", "e"]:
+        return v.text
+    if tp == "d":
+        # an ISO 8601 date written in place of a serial number
+        try:
+            return datetime.fromisoformat(v.text.rstrip("Z"))
+        except ValueError:
+            return v.text
+    return _number(float(v.text))
+
+
+def ordered_map(func: Callable, items: Iterable, worker: int,
+                in_flight: Optional[int] = None) -> Iterator:
+    """
+    使用多个进程对 items 中的每一项调用 func，按照 items 的顺序返回结果
+
+    同时最多有 in_flight 个任务（默认为进程数的两倍）已经提交但是结果还没有被取走，
+    限制读取大量文件时占用的内存；worker <= 1 时在当前进程中依次调用
+    """
+    if worker <= 1:
+        for item in items:
+            yield func(item)
+        return
+    if in_flight is None:
+        in_flight = 2 * worker
+    with ProcessPoolExecutor(max_workers=worker) as executor:
+        pending = deque()
+        try:
+            for item in items:
+                if len(pending) >= in_flight:
+                    yield pending.popleft().result()
+                pending.append(executor.submit(func, item))
+            while len(pending) != 0:
+                yield pending.popleft().result()
+        finally:
+            # the consumer stopped early, drop what was not started
+            for future in pending:
+                future.cancel()
 
 
 def load_words(path: str) -> List[str]:
@@ -44,23 +238,53 @@ def load_words(path: str) -> List[str]:
     return content.replace("\n", " ").split()
 
 
-def prepare_data(root_path: str, index_path: str, tracker) -> \
+def data_fingerprint(root_path: str, index_path: str) -> str:
+    """装载数据的输入指纹，包括索引文件以及 data 文件夹中的所有文件"""
+    data_path = join(root_path, DATA_PATH)
+    paths = [join(data_path, f) for f in sorted(listdir(data_path))]
+    return file_fingerprint([index_path] + [p for p in paths if isfile(p)])
+
+
+def restore_data(root_path: str, index_path: str, store: ArtifactStore) -> \
+        Optional[Tuple[Dict[str, Dict[str, str]], Dict[str, int]]]:
+    """输入没有变化时返回上次装载的数据，否则返回 None"""
+    if not exists(join(root_path, DATA_PATH)) or not isfile(index_path):
+        return None
+    return store.load(ARTIFACT_LOAD_DATA,
+                      data_fingerprint(root_path, index_path))
+
+
+def prepare_data(root_path: str, index_path: str, tracker,
+                 store: Optional[ArtifactStore] = None,
+                 worker: int = INGEST_WORKER) -> \
         Tuple[Dict[str, Dict[str, str]], Dict[str, int]]:
     """
     返回格式为：
         { category_name: ({ article_name: content }, order_index) }
+
+    提供 store 时，索引文件与 data 文件夹都没有变化则直接返回上次装载的数据；
+    文件按照文件名顺序处理，由 worker 个进程同时读取
     """
     data_path = join(root_path, DATA_PATH)
     if not exists(data_path):
         raise ValueError("根目录没有 data 文件夹! 请先进行预处理，或选择其他根目录！")
+    if store is not None:
+        stage_fingerprint = data_fingerprint(root_path, index_path)
+        restored = store.load(ARTIFACT_LOAD_DATA, stage_fingerprint)
+        if restored is not None:
+            tracker.log("数据没有变化, 使用上次装载的数据", prt=True)
+            return restored
     data = {}
     ordering = {}
-    dirs = listdir(data_path)
+    # sorted, so the order of data does not depend on the file system
+    dirs = sorted(listdir(data_path))
     index_map = get_index_map(path_to_index=index_path, tracker=tracker)
     index_files = set([
         (category, title) for title, _, category, _, _, _, _ in index_map
     ])
     tracker.init_ticker("   进程", "正在装载数据", 0, len(dirs))
+    # check the names first, then read the accepted files concurrently
+    accepted = []
     for file_name in dirs:
         # get the abs path
         abs_path = join(data_path, file_name)
@@ -80,7 +304,6 @@ def prepare_data(root_path: str, index_path: str, tracker) -> \
             tracker.tick()
             continue
         else:
-            content = get_text(abs_path)
             category = str(file_args[2])
             name = str(file_args[3])
             order_index = int(file_args[1])
@@ -92,44 +315,69 @@ def prepare_data(root_path: str, index_path: str, tracker) -> \
                 tracker.tick()
                 continue
             index_files.remove(indices)
-            tracker.update_disc_fill("处理 {}".format(file_name))
-            tracker.log("处理 {} [category={}, name={}, order_index={}]".format(
-                file_name, category, name, order_index), prt=True)
-            if category not in data:
-                data[category] = {}
-                ordering[category] = order_index
-            c_dict = data[category]
-            o_index = ordering[category]
-            if o_index != order_index:
-                tracker.log(
-                    "读取数据错误！ 相同类别, 不同排序, 自动分类成 {} : "
-                    "[file={}, index={}, expected_index={}]".format(
-                        o_index, abs_path, order_index, o_index
-                    ),
-                    tp=TRACKER_LOG_WARNING, prt=True)
-            c_dict[name] = content
-            tracker.tick()
+            accepted.append((file_name, category, name, order_index))
+    contents = ordered_map(
+        get_text, [join(data_path, f) for f, _, _, _ in accepted], worker)
+    for (file_name, category, name, order_index), content in \
+            zip(accepted, contents):
+        abs_path = join(data_path, file_name)
+        tracker.update_disc_fill("处理 {}".format(file_name))
+        tracker.log("处理 {} [category={}, name={}, order_index={}]".format(
+            file_name, category, name, order_index), prt=True)
+        if category not in data:
+            data[category] = {}
+            ordering[category] = order_index
+        c_dict = data[category]
+        o_index = ordering[category]
+        if o_index != order_index:
+            tracker.log(
+                "读取数据错误！ 相同类别, 不同排序, 自动分类成 {} : "
+                "[file={}, index={}, expected_index={}]".format(
+                    o_index, abs_path, order_index, o_index
+                ),
+                tp=TRACKER_LOG_WARNING, prt=True)
+        c_dict[name] = content
+        tracker.tick()
     if len(index_files) != 0:
         # there are something missing
         raise Exception("缺少文件! 请再次运行 预处理 或检查索引文件! [{}]".format(
             ",".join(
                 "{}_{}".format(category, name) for category, name in
                 index_files)))
+    if store is not None:
+        store.save(ARTIFACT_LOAD_DATA, (data, ordering), stage_fingerprint)
     return data, ordering
 
 
 def get_text(path: str) -> str:
-    text = "".join(
-        line.split("|", 1)[-1].strip() for line in
-        extract_content(path).split("\n") if not line.startswith("#")
-    )
-    result = findall("(.*?[.。])", text)
-    return "\n".join(result)
+    """
+    读取一个数据文件，每行一个句子，跳过注释行以及每行 '|' 之前的可信度
+
+    行与行之间直接连接，所以一个句子可以跨越多行
+    """
+    text = "".join([
+        line.split("|", 1)[-1].strip() for line in iter_lines(path)
+        if not line.startswith("#")
+    ])
+    return split_sentences(text)
+
+
+def split_sentences(text: str) -> str:
+    """
+    在 SENTENCE_TERMINATORS 中的每个字符之后换行，每行一个句子；
+    最后一个结束符号之后剩余的文本作为最后一个句子保留
+    """
+    # one str.replace per terminator runs in c and builds no match objects,
+    # several times faster than a regex over the whole text
+    for terminator in SENTENCE_TERMINATORS:
+        text = text.replace(terminator, terminator + "\n")
+    head, _, rest = text.rpartition("\n")
+    return text if rest.strip() != "" else head
 
 
 def get_additional_pram(path_to_additional_pram: str, tracker) -> dict:
-    df = pd.read_excel(path_to_additional_pram)
-    return {str(r[0]): process_pram(r[1:], tracker) for _, r in df.iterrows()}
+    return {str(r[0]): process_pram(r[1:], tracker)
+            for r in read_excel_rows(path_to_additional_pram)}
 
 
 def get_index_map(path_to_index: str, tracker) -> \
@@ -139,8 +387,8 @@ def get_index_map(path_to_index: str, tracker) -> \
     返回 format 为
     [(title, file_path, category, sort_index, start_index, end_index), ...]
     """
-    df = pd.read_excel(path_to_index)
-    index = [process_index_rule(r, tracker) for _, r in df.iterrows()]
+    index = [process_index_rule(r, tracker)
+             for r in read_excel_rows(path_to_index)]
     return sorted(index, key=lambda a: (a[3]))
 
 
@@ -155,7 +403,7 @@ def process_index_rule(r, tracker) -> Tuple[str, str, str, int, int, int, dict]:
     title, file_path, cat, sort, beg, end = r[:6]
     pram = process_pram(r[6:], tracker)
     sort = int(sort)
-    if pd.isna(beg) or pd.isna(end):
+    if is_empty_cell(beg) or is_empty_cell(end):
         beg, end = None, None
     else:
         beg, end = int(beg), int(end)
@@ -166,7 +414,7 @@ def process_index_rule(r, tracker) -> Tuple[str, str, str, int, int, int, dict]:
 def process_pram(s: list, tracker) -> dict:
     pram = {}
     for cell in s:
-        if pd.isna(cell):
+        if is_empty_cell(cell):
             continue
         for par in str(cell).split("|"):
             key, value = par.split("=", 1)
@@ -177,6 +425,11 @@ def process_pram(s: list, tracker) -> dict:
     return pram
 
 
+def is_empty_cell(cell) -> bool:
+    """excel 中的空单元格会被读取为 None 或者 nan"""
+    return cell is None or (isinstance(cell, float) and isnan(cell))
+
+
 def process_pram_value(key, value, tracker):
     if key in [ADDI_PARM_CROP]:
         v = value.split("/")
@@ -188,5 +441,24 @@ def process_pram_value(key, value, tracker):
         return int(v[0]), int(v[1]), int(v[2]), int(v[3])
     elif key in [ADDI_PARM_LANG]:
         return value
+    elif key in [ADDI_PARM_BINARIZE]:
+        v = [s.strip() for s in value.split("/")]
+        method = v[0].upper()
+        try:
+            if method == BINARIZE_FIXED:
+                return method, int(v[1]) if len(v) > 1 else BINARIZE_THRESHOLD
+            if method == BINARIZE_OTSU:
+                return method,
+            if method == BINARIZE_SAUVOLA:
+                return (method,
+                        int(v[1]) if len(v) > 1 else SAUVOLA_DEFAULT_WINDOW,
+                        float(v[2]) if len(v) > 2 else SAUVOLA_DEFAULT_K)
+        except ValueError:
+            pass
+        tracker.log(
+            "额外参数值加载错误，应为 FIXED/阈值, OTSU 或者 SAUVOLA/窗口/k "
+            "[key='{}', value='{}']".format(key, value),
+            tp=TRACKER_LOG_WARNING, prt=True)
+        return None
     else:
         return None
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+
+"""
+OCR 结果缓存模块，输入不变时重新预处理不需要再次调用 Tesseract
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from os import listdir, makedirs, remove, replace, stat, utime
+from os.path import exists, join, normpath
+from typing import List, Optional, Tuple
+
+CACHE_SUFFIX = ".json"
+
+
+class OCRCache:
+    """
+    以内容哈希为键的 OCR 结果缓存
+
+    键为 (页面图像, CROP, LANG, tessdata, 二值化参数) 的哈希，
+    值为 get_content 返回的 [(line, confidence), ...]，
+    每个结果保存为缓存文件夹中的一个文件，
+    缓存总大小超过 size_limit 时淘汰最久没有使用的结果
+
+    成员变量如下：
+    === 私有变量 ===
+    _folder: 缓存文件夹
+    _size_limit: 缓存大小上限（字节）
+    _entries: { key: size }，按最近使用时间排序，最久没有使用的在前
+    _size: 缓存当前大小（字节）
+    """
+
+    def __init__(self, folder: str, size_limit: int) -> None:
+        """初始化 OCRCache，扫描一次缓存文件夹"""
+        self._folder = folder
+        self._size_limit = size_limit
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if not exists(folder):
+            makedirs(folder)
+        found = []
+        for f in listdir(folder):
+            if not f.endswith(CACHE_SUFFIX):
+                continue
+            st = stat(join(folder, f))
+            found.append((st.st_mtime, f[:-len(CACHE_SUFFIX)], st.st_size))
+        found.sort()
+        self._entries = OrderedDict((key, size) for _, key, size in found)
+        self._size = sum(self._entries.values())
+
+    @staticmethod
+    def make_key(page,
+                 image_crop_pram: Optional[Tuple[int, int, int, int]],
+                 lang: str,
+                 tessdata_path: str,
+                 binarize) -> str:
+        """计算一页的缓存键，page 为图像地址或者内存中的 PIL 图像"""
+        digest = hashlib.sha256()
+        if isinstance(page, str):
+            with open(page, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(chunk)
+        else:
+            digest.update(repr((page.mode, page.size)).encode("utf8"))
+            digest.update(page.tobytes())
+        digest.update(repr((
+            None if image_crop_pram is None else tuple(image_crop_pram),
+            lang,
+            normpath(tessdata_path),
+            binarize,
+        )).encode("utf8"))
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return join(self._folder, key + CACHE_SUFFIX)
+
+    def get(self, key: str) -> Optional[List[Tuple[str, float]]]:
+        """返回缓存的识别结果，没有缓存时返回 None"""
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            path = self._path(key)
+            try:
+                with open(path, "r", encoding="utf8") as f:
+                    content = json.load(f)
+                # mark it as recently used
+                utime(path)
+            except (OSError, ValueError):
+                self._discard(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return [(line, conf) for line, conf in content]
+
+    def put(self, key: str, content: List[Tuple[str, float]]) -> None:
+        """保存识别结果，并淘汰最久没有使用的结果"""
+        data = json.dumps(content, ensure_ascii=False).encode("utf8")
+        with self._lock:
+            path = self._path(key)
+            temp_path = path + ".tmp"
+            with open(temp_path, "wb") as f:
+                f.write(data)
+            replace(temp_path, path)
+            self._size -= self._entries.pop(key, 0)
+            self._entries[key] = len(data)
+            self._size += len(data)
+            while self._size > self._size_limit and len(self._entries) > 1:
+                oldest = next(iter(self._entries))
+                self._discard(oldest)
+
+    def _discard(self, key: str) -> None:
+        self._size -= self._entries.pop(key, 0)
+        try:
+            remove(self._path(key))
+        except OSError:
+            pass
@@ -1,28 +1,37 @@
 # -*- coding: utf-8 -*-
 
-from typing import Any, Dict
-
-import xlsxwriter
-from pinyin import pinyin
+import sys
+from itertools import chain, islice
+from typing import Any, Dict, Iterable, List, Mapping, Optional
 
 from hf_analysis.parameter import *
 
 
 def write_excel(path,
                 total_summary: Dict[str, Dict[str, Any]],
-                detail_summary: Dict[str, Dict[str, Dict[str, int]]],
+                detail_summary: Mapping[str, Mapping[str, Mapping[str, int]]],
                 sorting,
                 tracker,
-                show_detail):
+                show_detail,
+                constant_memory: bool = True):
     """
     Total summary:
         { tag: { detail } }
     Detail summary:
-        { category: { article: { tag: int } }
+        { category: { tag: { article: int } } }，
+        可以是嵌套字典，也可以是 CountMatrix 这样的只读视图
+
+    constant_memory 为 True 时按行流式写入，每写完一行即写入临时文件，
+    列宽只根据前 EXPORT_WIDTH_SAMPLE 行计算；为 False 时整个文件保存在内存中，
+    列宽根据所有的行计算，两种模式写入的数据相同
     """
+    import xlsxwriter
+    from pinyin import pinyin
     tracker.log("正在创建 Excel 文件", prt=True)
     # first write the summary page
-    workbook = xlsxwriter.Workbook(path)
+    workbook = xlsxwriter.Workbook(
+        path, {"constant_memory": constant_memory})
+    width_sample = EXPORT_WIDTH_SAMPLE if constant_memory else None
     # some format
     title_format = workbook.add_format({"bold": True})
     # create the summary worksheet
@@ -30,112 +39,106 @@ def write_excel(path,
     # init accum
     tracker.init_ticker("   进程", "正在输出", 0, len(total_summary) + sum(
         len(tag_details) for tag_details in detail_summary.values()))
-    row, col = 0, 0
-    max_width = []
-    summary.write_string(row, col, "词汇", cell_format=title_format)
-    max_width.append(2 * WIDTH_RATIO)
-    col += 1
-    summary.write_string(row, col, "趋势标签", cell_format=title_format)
-    max_width.append(4 * WIDTH_RATIO)
-    col += 1
-    if show_detail:
-        summary.write_string(row, col, "拟合系数", cell_format=title_format)
-        max_width.append(4 * WIDTH_RATIO)
-        col += 1
-        summary.write_string(row, col, "R^2", cell_format=title_format)
-        max_width.append(4 * WIDTH_RATIO)
-        col += 1
     # write header
     cat_header = sorted(sorting.items(), key=lambda i: i[1])
-    for category, _ in cat_header:
-        summary.write_string(row, col, category, cell_format=title_format)
-        max_width.append(len(category) * WIDTH_RATIO)
-        col += 1
-    row += 1
-    col = 0
-    # write values
-    for tag, detail in total_summary.items():
-        tracker.update_disc_fill("写入总结 {}".format(tag))
-        tracker.tick()
-        # write tag
-        summary.write_string(row, col, tag)
-        max_width[col] = max(len(tag) * WIDTH_RATIO, max_width[col])
-        col += 1
-        # write label
-        label = detail["label"]
-        if label is not None:
-            label_name = TREND_NAME[label]
-            summary.write_string(row, col, label_name)
-            max_width[col] = max(len(label_name) * WIDTH_RATIO, max_width[col])
-        else:
-            summary.write_string(row, col, "-")
-            max_width[col] = max(1, max_width[col])
-        col += 1
-        # write detail
-        if show_detail:
-            lr = detail["regression"]
-            if lr is not None:
-                coefficient, _, R_2 = lr
-                summary.write_number(row, col, coefficient)
-                max_width[col] = max(len(str(coefficient)), max_width[col])
-                col += 1
-                summary.write_number(row, col, R_2)
-                max_width[col] = max(len(str(R_2)), max_width[col])
-                col += 1
-            else:
-                summary.write_string(row, col, "-")
-                max_width[col] = max(1, max_width[col])
-                col += 1
-                summary.write_string(row, col, "-")
-                max_width[col] = max(1, max_width[col])
-                col += 1
-        # write
-        occurrence = detail["occurrence"]
-        for occ in occurrence:
-            summary.write_number(row, col, occ)
-            max_width[col] = max(len(str(occ)), max_width[col])
-            col += 1
-        row += 1
-        col = 0
-    for index, width in enumerate(max_width):
-        summary.set_column(index, index, width=width)
+    titles = [("词汇", 2 * WIDTH_RATIO), ("趋势标签", 4 * WIDTH_RATIO)]
+    if show_detail:
+        titles += [("拟合系数", 4 * WIDTH_RATIO), ("R^2", 4 * WIDTH_RATIO)]
+    titles += [(category, len(category) * WIDTH_RATIO)
+               for category, _ in cat_header]
+    _write_sheet(summary, titles, _summary_rows(total_summary, show_detail),
+                 title_format, tracker, "写入总结", width_sample)
     # write detail
     # { category: { tag: { article: int } }
     for category, _ in cat_header:
         tag_details = detail_summary[category]
         work_sheet = workbook.add_worksheet(category)
-        row, col = 0, 0
-        max_width = []
-        work_sheet.write_string(row, col, "词汇", cell_format=title_format)
-        max_width.append(2 * WIDTH_RATIO)
-        col += 1
-        # write header
         header = sorted(
             next(iter(tag_details.values())).keys(),
             key=lambda n: pinyin.get(n, format="strip", delimiter=" ")
         )
-        # write header
-        for name in header:
-            work_sheet.write_string(row, col, name, cell_format=title_format)
-            max_width.append(len(name) * WIDTH_RATIO)
-            col += 1
-        row += 1
-        col = 0
-        # write values
-        for tag, art_detail in tag_details.items():
-            tracker.update_disc_fill("写入细节 {}".format(tag))
-            tracker.tick()
-            work_sheet.write_string(row, col, tag)
-            max_width[col] = max(len(tag) * WIDTH_RATIO, max_width[col])
-            col += 1
-            for name in header:
-                val = art_detail[name]
-                work_sheet.write_number(row, col, val)
-                max_width[col] = max(len(str(val)), max_width[col])
-                col += 1
-            row += 1
-            col = 0
-        for index, width in enumerate(max_width):
-            work_sheet.set_column(index, index, width=width)
+        titles = [("词汇", 2 * WIDTH_RATIO)] + [
+            (name, len(name) * WIDTH_RATIO) for name in header
+        ]
+        rows = (
+            [tag] + [art_detail[name] for name in header]
+            for tag, art_detail in tag_details.items()
+        )
+        _write_sheet(work_sheet, titles, rows, title_format, tracker,
+                     "写入细节", width_sample)
     tracker.log("正在关闭 Excel 文件", prt=True)
     workbook.close()
+    peak = peak_memory()
+    if peak is not None:
+        tracker.log("输出完成, 内存峰值 {:.1f}MB".format(peak), prt=True)
+
+
+def _summary_rows(total_summary: Dict[str, Dict[str, Any]],
+                  show_detail) -> Iterable[List[Any]]:
+    """按行生成总结页的值"""
+    for tag, detail in total_summary.items():
+        label = detail["label"]
+        row = [tag, "-" if label is None else TREND_NAME[label]]
+        if show_detail:
+            lr = detail["regression"]
+            if lr is not None:
+                coefficient, _, R_2 = lr
+                row += [coefficient, R_2]
+            else:
+                row += ["-", "-"]
+        row += detail["occurrence"]
+        yield row
+
+
+def _cell_width(value) -> float:
+    if isinstance(value, str):
+        return len(value) * WIDTH_RATIO
+    return len(str(value))
+
+
+def _write_sheet(work_sheet, titles, rows: Iterable[List[Any]],
+                 title_format, tracker, disc: str,
+                 width_sample: Optional[int]) -> None:
+    """
+    按顺序写入一页，第一列为词汇
+
+    参数列表如下：
+    :param work_sheet: 工作表
+    :param titles: [(标题, 最小列宽), ...]
+    :param rows: 按行生成的值，字符串写为文字，其余写为数字
+    :param disc: 进度描述
+    :param width_sample: 计算列宽使用的行数，为 None 时使用所有的行
+    """
+    rows = iter(rows)
+    # the widths are set before any row is written, so a streamed sheet
+    # never has to go back to the rows it already flushed
+    sample = list(rows if width_sample is None else islice(rows, width_sample))
+    max_width = [width for _, width in titles]
+    for values in sample:
+        for col, value in enumerate(values):
+            max_width[col] = max(_cell_width(value), max_width[col])
+    for index, width in enumerate(max_width):
+        work_sheet.set_column(index, index, width=width)
+    # write header
+    for col, (title, _) in enumerate(titles):
+        work_sheet.write_string(0, col, title, cell_format=title_format)
+    # write values
+    for row, values in enumerate(chain(sample, rows), start=1):
+        tracker.update_disc_fill("{} {}".format(disc, values[0]))
+        tracker.tick()
+        for col, value in enumerate(values):
+            if isinstance(value, str):
+                work_sheet.write_string(row, col, value)
+            else:
+                work_sheet.write_number(row, col, value)
+
+
+def peak_memory() -> Optional[float]:
+    """返回当前进程的内存峰值（MB），系统不支持时返回 None"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # linux reports kilobytes, macos reports bytes
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
@@ -0,0 +1,456 @@
+# -*- coding: utf-8 -*-
+
+"""
+pdf 页面图像缓存的索引模块，记录已经转换好的 pdf 页面图像，
+查找页面时不需要扫描整个缓存文件夹
+"""
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from os import fstat, getpid, listdir, makedirs, remove, replace, stat, utime
+from os.path import basename, isfile, join, splitext
+from typing import Dict, Iterable, Optional, Tuple
+
+INDEX_FILE = "page_index.jsonl"
+LOCK_FILE = "page_index.lock"
+# every running process holds a lease file here
+LEASE_FOLDER = "leases"
+# a lease not renewed for this long belongs to a process that died
+LEASE_TIMEOUT = 60 * 60
+# evict down to this share of the size limit, so that a full cache does not
+# reload the index on every new page
+EVICT_RATIO = 0.9
+
+# length of the pdf content hash used in the image file names
+DIGEST_LENGTH = 16
+
+
+def extract_page_number(path: str) -> int:
+    name = str(basename(path).rsplit(".", maxsplit=1)[0])
+    return int(name.split("-")[2])
+
+
+def extract_info(path: str) -> Optional[Tuple[str, int, int, str]]:
+    name, format_ = splitext(basename(path))
+    seg = name.split("-")
+    if len(seg) != 3:
+        return None
+    prefix, dpi, page_number = seg
+    return str(prefix), int(dpi), int(page_number), str(format_)
+
+
+def legacy_images(folder: str) -> Dict[Tuple[str, int], Dict[int, str]]:
+    """
+    返回 folder 中以旧的 "pdf 文件名-DPI-页码" 命名的页面图像
+    { (pdf 文件名, DPI): { 页码: 图像地址 } }，交给 PageIndex.adopt 移入缓存
+    """
+    found = {}
+    for f in listdir(folder):
+        p = join(folder, f)
+        try:
+            info = extract_info(f)
+        except ValueError:
+            continue
+        if info is None or not isfile(p):
+            continue
+        prefix, dpi, page_number, _ = info
+        found.setdefault((prefix, dpi), {})[page_number] = p
+    return found
+
+
+def file_checksum(path: str) -> int:
+    """计算文件内容的 crc32"""
+    checksum = 0
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            checksum = zlib.crc32(chunk, checksum)
+    return checksum
+
+
+def pdf_digest(path: str) -> str:
+    """计算 pdf 内容的哈希，重命名或者移动 pdf 不会改变哈希"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:DIGEST_LENGTH]
+
+
+def image_prefix(digest: str, engine: bool) -> str:
+    """页面图像文件名的前缀，不能包含 '-'"""
+    return "{}{}".format(digest, "c" if engine else "p")
+
+
+def _parse_prefix(prefix: str) -> Optional[Tuple[str, bool]]:
+    """image_prefix 的逆运算，返回 (pdf 哈希, 引擎)，不是缓存的图像时返回 None"""
+    digest, engine = prefix[:-1], prefix[-1:]
+    if len(digest) != DIGEST_LENGTH or engine not in ("c", "p"):
+        return None
+    try:
+        int(digest, 16)
+    except ValueError:
+        return None
+    return digest, engine == "c"
+
+
+@contextmanager
+def file_lock(path: str):
+    """在多个进程之间互斥的文件锁"""
+    with open(path, "a+b") as f:
+        if os.name == "nt":
+            import msvcrt
+            f.seek(0)
+            while True:
+                try:
+                    # gives up after about ten seconds, so keep trying
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    pass
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class PageIndex:
+    """
+    以 pdf 内容哈希为键的页面图像缓存索引，保存为缓存文件夹中的 JSON lines 文件
+
+    每行记录一个页面 (pdf 哈希, 引擎, DPI, 格式, 页码) -> (文件名, 大小, crc32)
+    以及最近使用的时间，新转换的页面追加到文件末尾，同一页面以最后一行为准；
+    一次运行中第一次查找某个 pdf 时追加一行不含页码的记录，更新这个 pdf
+    所有页面的使用时间；缓存总大小超过 size_limit 时淘汰最久没有使用的页面；
+    查找页面时检查图像的大小与 crc32，不一致的页面被丢弃并重新转换；
+    缓存文件夹中没有索引文件时扫描一次文件夹，为已有的页面图像建立索引
+
+    缓存文件夹可以被多个进程（多个项目）同时使用：读写索引文件都在文件锁中进行，
+    每次只读取上次读取之后其他进程追加的部分，文件被重写时才重新读取整个文件；
+    每个进程在 LEASE_FOLDER 中保持一个租约，
+    在仍在运行的进程中最早开始的那个开始之后使用过的页面不会被淘汰
+
+    成员变量如下：
+    === 私有变量 ===
+    _folder: 缓存文件夹
+    _size_limit: 缓存大小上限（字节）
+    _entries: { (pdf 哈希, 引擎, DPI, 扩展名, 页码): (文件名, 大小, crc32, 使用时间) }
+    _groups: { (pdf 哈希, 引擎, DPI): { 页面的键 } }，查找时只需要看同一个 pdf 的页面
+    _size: 缓存当前大小（字节）
+    _lines: 索引文件的行数，行数远多于页面数时重写
+    _offset: 索引文件已经读取到的位置（字节）
+    _file_id: 索引文件的 (st_dev, st_ino)，文件被重写后改变
+    _touched: 这次运行中已经记录过使用时间的 (pdf 哈希, 引擎, DPI)
+    _lease: 这个进程的租约文件
+    _check_size: 缓存大小超过这个值时才尝试淘汰
+    """
+
+    def __init__(self, folder: str, size_limit: int) -> None:
+        """初始化 PageIndex，读取索引文件，没有索引文件时扫描缓存文件夹"""
+        self._folder = folder
+        self._size_limit = size_limit
+        self._lock = threading.Lock()
+        self._reset()
+        self._touched = set()
+        self._check_size = size_limit
+        lease_folder = join(folder, LEASE_FOLDER)
+        makedirs(lease_folder, exist_ok=True)
+        self._lease = join(lease_folder, "{}-{}".format(
+            getpid(), time.time_ns()))
+        open(self._lease, "w").close()
+        with file_lock(join(folder, LOCK_FILE)):
+            self._refresh()
+            if self._file_id is None:
+                self._scan()
+
+    def _reset(self) -> None:
+        self._entries = {}
+        self._groups = {}
+        self._size = 0
+        self._lines = 0
+        self._offset = 0
+        self._file_id = None
+
+    def _refresh(self) -> None:
+        """读取其他进程追加的行，索引文件被重写或者删除时重新读取"""
+        try:
+            st = stat(join(self._folder, INDEX_FILE))
+        except OSError:
+            self._reset()
+            return
+        if (st.st_dev, st.st_ino) != self._file_id or \
+                st.st_size < self._offset:
+            self._reset()
+            self._file_id = st.st_dev, st.st_ino
+        if st.st_size == self._offset:
+            return
+        with open(join(self._folder, INDEX_FILE), "rb") as f:
+            f.seek(self._offset)
+            data = f.read()
+        self._offset += len(data)
+        for line in data.decode("utf8", errors="replace").splitlines():
+            self._lines += 1
+            self._apply(line)
+
+    def _apply(self, line: str) -> None:
+        try:
+            r = json.loads(line)
+            group = (r["pdf"], r["engine"], r["dpi"])
+            if "page" not in r:
+                self._touch(group, r["used"])
+                return
+            key = group + (r["format"], r["page"])
+            entry = (r["file"], r["size"], r["crc32"], r["used"])
+        except (ValueError, KeyError, TypeError):
+            # a line cut short by a crash, or an older layout
+            return
+        if r.get("removed", False):
+            self._discard(key)
+        else:
+            self._put(key, entry)
+
+    def _scan(self) -> None:
+        # called with the file lock held and no index file
+        for f in listdir(self._folder):
+            path = join(self._folder, f)
+            try:
+                info = extract_info(f)
+            except ValueError:
+                continue
+            if info is None or not isfile(path):
+                continue
+            prefix, dpi, page, extension = info
+            parsed = _parse_prefix(prefix)
+            if parsed is None:
+                continue
+            st = stat(path)
+            self._put(parsed + (dpi, extension, page),
+                      (f, st.st_size, file_checksum(path), st.st_mtime))
+        self._rewrite()
+
+    def _put(self, key, entry) -> None:
+        self._discard(key)
+        self._entries[key] = entry
+        self._groups.setdefault(key[:3], set()).add(key)
+        self._size += entry[1]
+
+    def _discard(self, key) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._size -= entry[1]
+        group = self._groups[key[:3]]
+        group.discard(key)
+        if len(group) == 0:
+            del self._groups[key[:3]]
+
+    def _touch(self, group, used: float) -> None:
+        for key in self._groups.get(group, ()):
+            file, size, checksum, last = self._entries[key]
+            self._entries[key] = (file, size, checksum, max(last, used))
+
+    @staticmethod
+    def _line(key, entry, removed: bool = False) -> str:
+        digest, engine, dpi, extension, page = key
+        file, size, checksum, used = entry
+        record = {
+            "pdf": digest, "engine": engine, "dpi": dpi,
+            "format": extension, "page": page, "file": file, "size": size,
+            "crc32": checksum, "used": used,
+        }
+        if removed:
+            record["removed"] = True
+        return json.dumps(record) + "\n"
+
+    @staticmethod
+    def _touch_line(group, used: float) -> str:
+        digest, engine, dpi = group
+        return json.dumps({"pdf": digest, "engine": engine, "dpi": dpi,
+                           "used": used}) + "\n"
+
+    def _append(self, lines) -> None:
+        # called with the file lock held and the index just refreshed,
+        # so the end of the file is where this process stopped reading
+        if len(lines) == 0:
+            return
+        with open(join(self._folder, INDEX_FILE), "ab") as f:
+            f.write("".join(lines).encode("utf8"))
+            self._offset = f.tell()
+            st = fstat(f.fileno())
+        self._file_id = st.st_dev, st.st_ino
+        self._lines += len(lines)
+
+    def _renew(self) -> None:
+        try:
+            utime(self._lease)
+        except OSError:
+            # removed by someone else, take it again
+            open(self._lease, "w").close()
+
+    def lookup(self, digest: str, engine: bool, dpi: int,
+               cov_format: str,
+               pages: Optional[Iterable[int]] = None) -> Dict[int, str]:
+        """
+        返回 { 页码: 图像地址 }，只包括扩展名以 cov_format 结尾的页面；
+        pages 不为 None 时只查找并检查这些页面
+        """
+        group = (digest, engine, dpi)
+        wanted = None if pages is None else set(pages)
+        with self._lock:
+            with file_lock(join(self._folder, LOCK_FILE)):
+                self._renew()
+                # another process may have converted this pdf in the meantime
+                self._refresh()
+                candidates = [
+                    (key, self._entries[key])
+                    for key in self._groups.get(group, ())
+                    if key[3].endswith(cov_format) and
+                    (wanted is None or key[4] in wanted)]
+                if len(candidates) != 0 and group not in self._touched:
+                    # protects the pages from eviction by other processes
+                    now = time.time()
+                    self._touch(group, now)
+                    self._append([self._touch_line(group, now)])
+                    self._touched.add(group)
+            # the images are read outside the file lock
+            found, corrupted = {}, []
+            for key, entry in candidates:
+                path = join(self._folder, entry[0])
+                if self._valid(path, entry):
+                    found[key[4]] = path
+                else:
+                    corrupted.append((key, entry))
+            if len(corrupted) != 0:
+                with file_lock(join(self._folder, LOCK_FILE)):
+                    self._refresh()
+                    self._remove(
+                        [(key, entry) for key, entry in corrupted
+                         if self._entries.get(key, (None,))[:3] ==
+                         entry[:3]])
+        return found
+
+    @staticmethod
+    def _valid(path: str, entry) -> bool:
+        _, size, checksum, _ = entry
+        try:
+            return stat(path).st_size == size and \
+                file_checksum(path) == checksum
+        except OSError:
+            return False
+
+    def _remove(self, entries) -> None:
+        # called with the file lock held and the index just refreshed
+        removed = []
+        for key, entry in entries:
+            self._discard(key)
+            removed.append(self._line(key, entry, True))
+            try:
+                remove(join(self._folder, entry[0]))
+            except OSError:
+                pass
+        self._append(removed)
+
+    def add(self, digest: str, engine: bool, dpi: int, page: int,
+            path: str) -> None:
+        """记录一个新转换的页面，并淘汰最久没有使用的页面"""
+        _, extension = splitext(path)
+        key = (digest, engine, dpi, extension, page)
+        entry = (basename(path), stat(path).st_size, file_checksum(path),
+                 time.time())
+        with self._lock, file_lock(join(self._folder, LOCK_FILE)):
+            self._renew()
+            self._refresh()
+            self._put(key, entry)
+            self._append([self._line(key, entry)])
+            if self._size > self._check_size:
+                self._evict()
+                # when the pages in use fill the cache, try again only after
+                # another share of the limit has been added
+                self._check_size = max(
+                    self._size_limit,
+                    self._size + self._size_limit * (1 - EVICT_RATIO))
+
+    def adopt(self, digest: str, engine: bool, dpi: int,
+              images: Dict[int, str]) -> None:
+        """把旧命名的页面图像 { 页码: 图像地址 } 移入缓存文件夹并记录"""
+        prefix = image_prefix(digest, engine)
+        for page, path in images.items():
+            _, extension = splitext(path)
+            target = join(self._folder, "{}-{}-{}{}".format(
+                prefix, dpi, page, extension))
+            try:
+                replace(path, target)
+            except OSError:
+                # the cache is on another drive
+                shutil.move(path, target)
+            self.add(digest, engine, dpi, page, target)
+
+    def _oldest_lease(self) -> float:
+        """仍在运行的进程中最早开始的时间，这之后使用过的页面可能正在被读取"""
+        folder = join(self._folder, LEASE_FOLDER)
+        oldest = time.time()
+        for name in listdir(folder):
+            path = join(folder, name)
+            try:
+                renewed = stat(path).st_mtime
+                started = int(name.rsplit("-", maxsplit=1)[1]) / 1e9
+            except (OSError, ValueError, IndexError):
+                continue
+            if time.time() - renewed > LEASE_TIMEOUT:
+                try:
+                    remove(path)
+                except OSError:
+                    pass
+                continue
+            oldest = min(oldest, started)
+        return oldest
+
+    def _evict(self) -> None:
+        # called with the file lock held and the index just refreshed
+        protected = self._oldest_lease()
+        target = self._size_limit * EVICT_RATIO
+        evicted = []
+        size = self._size
+        for key, entry in sorted(self._entries.items(),
+                                 key=lambda i: i[1][3]):
+            if size <= target or entry[3] >= protected:
+                break
+            size -= entry[1]
+            evicted.append((key, entry))
+        self._remove(evicted)
+
+    def close(self) -> None:
+        """归还租约，索引文件的行数远多于页面数时重写索引文件"""
+        with self._lock, file_lock(join(self._folder, LOCK_FILE)):
+            self._refresh()
+            if self._lines > 2 * len(self._entries):
+                self._rewrite()
+            try:
+                remove(self._lease)
+            except OSError:
+                pass
+
+    def _rewrite(self) -> None:
+        # called with the file lock held and the index just refreshed
+        path = join(self._folder, INDEX_FILE)
+        temp_path = path + ".tmp"
+        with open(temp_path, "wb") as f:
+            f.write("".join(self._line(key, entry) for key, entry
+                            in self._entries.items()).encode("utf8"))
+        replace(temp_path, path)
+        st = stat(path)
+        self._offset = st.st_size
+        self._file_id = st.st_dev, st.st_ino
+        self._lines = len(self._entries)
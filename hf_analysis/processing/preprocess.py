@@ -1,15 +1,21 @@
 # -*- coding: utf-8 -*-
-import pathlib
-from os import makedirs
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from os import environ, makedirs
 from os.path import abspath, basename
 from textwrap import wrap
-from typing import Optional
-
-from PIL import Image
-from pdf2image import convert_from_path
-from tesserocr import PyTessBaseAPI, RIL, iterate_level
+from typing import Any, Iterator, Optional
 
+from hf_analysis.processing.binarize import binarize
 from hf_analysis.processing.load_data import *
+from hf_analysis.processing.ocr_cache import OCRCache
+from hf_analysis.processing.page_index import PageIndex, extract_page_number, \
+    image_prefix, legacy_images, pdf_digest
+# moved to page_index, still importable from here
+from hf_analysis.processing.page_index import extract_info  # noqa: F401
 
 
 def process(path_to_index: str,
@@ -20,8 +26,20 @@ def process(path_to_index: str,
             engine: bool,
             default_lang: str,
             tessdata_path: str,
-            tracker):
-    """format 为 [(title, file_path, cat, sort, beg, end), ...]"""
+            tracker,
+            ocr_worker: int = OCR_WORKER,
+            use_ocr_cache: bool = True,
+            keep_images: bool = KEEP_PAGE_IMAGES,
+            raster_cache_limit: int = RASTER_CACHE_SIZE_LIMIT,
+            ingest_worker: int = INGEST_WORKER):
+    """
+    format 为 [(title, file_path, cat, sort, beg, end), ...]
+
+    keep_images 为 False 时 pdf 页面转换后直接在内存中交给 OCR，
+    不再写入缓存文件夹（缓存文件夹中已有的页面图像仍然会被使用），
+    页面图像缓存超过 raster_cache_limit 字节时淘汰最久没有使用的页面；
+    文本文件先由 ingest_worker 个进程同时读取，再处理 pdf 文件
+    """
     # make sure the data folder exist
     data_folder = join(output_folder, DATA_PATH)
     temp_folder = join(output_folder, TEMP_PATH)
@@ -54,24 +72,48 @@ def process(path_to_index: str,
         sum(end - beg + 1 if beg is not None and end is not None else 1
             for _, _, _, _, beg, end, _ in index_map)
     )
+    ocr_cache = None
+    if use_ocr_cache:
+        ocr_cache = OCRCache(join(temp_folder, OCR_CACHE_PATH),
+                             OCR_CACHE_SIZE_LIMIT)
+    raster_folder = get_raster_cache_folder(temp_folder)
+    page_index = None
+    # page images written into the temp folder before the cache existed
+    legacy = legacy_images(temp_folder) if exists(temp_folder) else {}
+    text_files = [path for path in file_map
+                  if splitext(path)[1] not in [".pdf"]]
+    contents = ordered_map(extract_content, text_files, ingest_worker)
+    for path, content in zip(text_files, contents):
+        tracker.log("正在处理 文本 文件 : {}".format(path), prt=True)
+        process_text(path, data_folder, file_map[path], tracker, content)
     for path, setup in file_map.items():
         name, extension = splitext(path)
         if extension in [".pdf"]:
             tracker.log("正在处理 PDF 文件 : {}".format(path), prt=True)
-            if not exists(temp_folder):
-                makedirs(temp_folder)
-            process_pdf(path, temp_folder, data_folder, dpi, cov_format, engine,
-                        default_lang, tessdata_path, setup, tracker)
-        else:
-            tracker.log("正在处理 文本 文件 : {}".format(path), prt=True)
-            process_text(path, data_folder, setup, tracker)
+            if not exists(raster_folder):
+                makedirs(raster_folder)
+            if page_index is None:
+                # read once, shared by every pdf
+                page_index = PageIndex(raster_folder, raster_cache_limit)
+            images = legacy.pop((basename(name), dpi), None)
+            if images is not None:
+                page_index.adopt(pdf_digest(path), engine, dpi, images)
+            process_pdf(path, raster_folder, data_folder, dpi, cov_format,
+                        engine, default_lang, tessdata_path, setup, tracker,
+                        ocr_worker=ocr_worker, ocr_cache=ocr_cache,
+                        keep_images=keep_images, page_index=page_index)
+    if page_index is not None:
+        page_index.close()
 
 
 def process_text(path_to_text: str,
                  data_folder: str,
                  setup: List[Tuple[str, str, int, int, int, dict]],
-                 tracker) -> None:
-    content = extract_content(path_to_text)
+                 tracker,
+                 content: Optional[str] = None) -> None:
+    """content 为已经读取的文件内容，为 None 时读取 path_to_text"""
+    if content is None:
+        content = extract_content(path_to_text)
     # create a file that include all data in this page
     for title, cat, sort, beg, end, parm in setup:
         tracker.update_disc_fill("写入 {} <{}>".format(title, cat))
@@ -97,73 +139,147 @@ def scan_pdf(path_to_pdf: str,
              dpi: int,
              cov_format: str,
              engine: bool,
-             setup, tracker) -> Dict[int, str]:
+             setup, tracker,
+             batch_size: int = RASTER_BATCH_SIZE,
+             keep_images: bool = KEEP_PAGE_IMAGES,
+             page_index: Optional[PageIndex] = None) -> \
+        Iterator[Tuple[int, Any]]:
+    """
+    按照识别时取用的顺序（见 page_order）逐页返回 (页码, 页面)，
+    缓存文件夹 temp_folder 中已经转换过的页面直接返回，其余连续的页面每次转换
+    最多 batch_size 页，setup 中没有用到的页面不会被转换
+
+    keep_images 为 True 时页面保存在缓存文件夹中，页面为图像地址，
+    否则页面为内存中的灰度 PIL 图像；
+    已经转换过的页面按照 pdf 的内容哈希、引擎、DPI 与格式从 page_index 中查找，
+    为 None 时读取缓存文件夹的索引
+    """
+    from pdf2image import convert_from_path
     tracker.log(
-        "   转换 pdf -> {} [utilizing_thread={}]".format(
-            cov_format, USABLE_THREAD),
+        "   转换 pdf -> {} [utilizing_thread={}, batch={}]".format(
+            cov_format if keep_images else "内存", USABLE_THREAD, batch_size),
         prt=True)
-    # get the page range that we need to process
-    first_page = min(r[3] for r in setup)
-    last_page = max(r[4] for r in setup)
-    # find in the temp folder that is the pdf processed already
-    name, _ = splitext(basename(path_to_pdf))
-    # find the existing file
-    processed = {}
-    for f in listdir(temp_folder):
-        p = join(temp_folder, f)
-        if not isfile(p):
+    order = page_order(setup)
+    # find in the cache folder that is the pdf processed already
+    digest = pdf_digest(path_to_pdf)
+    if page_index is None:
+        page_index = PageIndex(temp_folder, RASTER_CACHE_SIZE_LIMIT)
+    processed = page_index.lookup(digest, engine, dpi, cov_format, order)
+    total_page = sum(1 for i in order if i not in processed)
+    name_generator = ("{}-{}".format(image_prefix(digest, engine), dpi)
+                      for _ in range(total_page))
+    # the consumer bounds the pages in flight, so pages are produced in
+    # the order it takes them, a run of consecutive pages at a time
+    n = 0
+    while n < len(order):
+        if order[n] in processed:
+            yield order[n], processed[order[n]]
+            n += 1
             continue
-        info = extract_info(f)
-        if info is None:
+        end = n + 1
+        while end < len(order) and end - n < batch_size and \
+                order[end] == order[end - 1] + 1 and \
+                order[end] not in processed:
+            end += 1
+        batch_start, batch_end = order[n], order[end - 1]
+        n = end
+        if not keep_images:
+            # pdftoppm streams the uncompressed pages through a pipe,
+            # pdf2image still needs a temp folder for pdftocairo
+            images = convert_from_path(
+                pdf_path=path_to_pdf,
+                dpi=dpi,
+                first_page=batch_start, last_page=batch_end,
+                grayscale=True,
+                use_pdftocairo=engine,
+                poppler_path=get_poppler_path(),
+                thread_count=min(USABLE_THREAD,
+                                 batch_end - batch_start + 1),
+            )
+            yield from zip(range(batch_start, batch_end + 1), images)
             continue
-        prefix, f_dpi, page_number, format_ = info
-        if prefix == name and f_dpi == dpi and format_.endswith(cov_format):
-            # we got this file already
-            processed[page_number] = str(p)
-    subsets, relev = get_relevant_subset(processed, first_page, last_page)
-    total_page = sum(e - s + 1 for s, e in subsets)
-    name_generator = ("{}-{}".format(name, dpi) for _ in range(total_page))
-    tracker.update_disc_fill("扫描 {}".format(basename(path_to_pdf)))
-    tracker.set_indeterminate(True)
-    # iterate through the subset
-    paths = {index: processed[index] for index in relev}
-    # import tkinter.messagebox
-    # tkinter.messagebox.showinfo("Test {}".format(paths),
-    #                             f":???")
-    for start, end in subsets:
-        # tkinter.messagebox.showinfo("Test {}".format(paths),
-        #                             f"start: {start}, end: {end}")
         temp_images_path = convert_from_path(
             pdf_path=path_to_pdf,
             dpi=dpi, output_folder=temp_folder,
-            first_page=start, last_page=end,
+            first_page=batch_start, last_page=batch_end,
             fmt=cov_format, paths_only=True, output_file=name_generator,
             use_pdftocairo=engine,
-            poppler_path=pathlib.PurePath(POPPLER_PATH),
-            thread_count=USABLE_THREAD,
+            poppler_path=get_poppler_path(),
+            thread_count=min(USABLE_THREAD, batch_end - batch_start + 1),
         )
-        paths.update({extract_page_number(p): p for p in temp_images_path})
-    tracker.set_indeterminate(False)
-    return paths
-
-
-def get_relevant_subset(processed: dict, first_page: int, last_page: int) -> \
-        Tuple[List[Tuple[int, int]], List[int]]:
-    relev = [i for i in processed if first_page <= i <= last_page]
-    if len(relev) == 0:
-        # we need to fetch all
-        return [(first_page, last_page)], relev
-    relev.sort()
-    middle = [(relev[i] + 1, relev[i + 1] - 1) for i in range(len(relev) - 1) if
-              (relev[i + 1] - 1) - (relev[i] + 1) >= 0]
-    # add first and last group
-    if first_page < relev[0]:
-        if (relev[0] - 1) - first_page >= 0:
-            middle = [(first_page, relev[0] - 1)] + middle
-    if relev[-1] < last_page:
-        if last_page - (relev[-1] + 1) >= 0:
-            middle = middle + [(relev[-1] + 1, last_page)]
-    return middle, relev
+        for p in sorted(temp_images_path, key=extract_page_number):
+            page_index.add(digest, engine, dpi, extract_page_number(p), p)
+            yield extract_page_number(p), p
+
+
+class PageProducer(threading.Thread):
+    """
+    在后台线程中转换 pdf 页面，转换好的页面放入有界队列，
+    队列满时暂停转换，转换最多领先识别 depth 页
+
+    成员变量如下：
+    === 私有变量 ===
+    _pages: 生成 (页码, 页面) 的迭代器
+    _queue: 转换好的页面
+    _halt: 设置后停止转换
+    _done: 是否已经取出了所有的页面
+    """
+
+    def __init__(self, pages: Iterator[Tuple[int, Any]], depth: int) -> None:
+        super().__init__(daemon=True)
+        self._pages = pages
+        self._queue = queue.Queue(maxsize=depth)
+        self._halt = threading.Event()
+        self._done = False
+
+    def run(self) -> None:
+        try:
+            for item in self._pages:
+                if not self._put(item):
+                    return
+        except Exception as e:
+            # hand the error to the consumer
+            self._put(e)
+            return
+        self._put(None)
+
+    def _put(self, item) -> bool:
+        while not self._halt.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def get(self) -> Optional[Tuple[int, Any]]:
+        """返回下一个转换好的页面 (页码, 页面)，没有更多的页面时返回 None"""
+        if self._done:
+            return None
+        item = self._queue.get()
+        if isinstance(item, Exception):
+            self._done = True
+            raise item
+        if item is None:
+            self._done = True
+        return item
+
+    def halt(self) -> None:
+        self._halt.set()
+
+
+def get_raster_cache_folder(temp_folder: str) -> str:
+    """页面图像缓存文件夹，设置了环境变量 RASTER_CACHE_ENV 时使用共享的文件夹"""
+    shared = environ.get(RASTER_CACHE_ENV, "")
+    if shared != "":
+        return shared
+    return join(temp_folder, RASTER_CACHE_PATH)
+
+
+def page_order(setup) -> List[int]:
+    """setup 中的条目依次识别时，每一页第一次被用到的顺序"""
+    return list(dict.fromkeys(
+        i for _, _, _, beg, end, _ in setup for i in range(beg, end + 1)))
 
 
 def process_pdf(path_to_pdf: str,
@@ -175,78 +291,369 @@ def process_pdf(path_to_pdf: str,
                 default_lang: str,
                 tessdata_path: str,
                 setup: List[Tuple[str, str, int, int, int, dict]],
-                tracker) -> None:
-    # first convert all pages of pdf to jpeg
-    page_num_map = scan_pdf(path_to_pdf,
-                            temp_folder,
-                            dpi,
-                            cov_format,
-                            engine,
-                            setup, tracker)
+                tracker,
+                ocr_worker: int = OCR_WORKER,
+                ocr_cache: Optional[OCRCache] = None,
+                keep_images: bool = KEEP_PAGE_IMAGES,
+                page_index: Optional[PageIndex] = None) -> None:
+    # the cache is shared by every pdf, so report this pdf's share only
+    if ocr_cache is not None:
+        hits, misses = ocr_cache.hits, ocr_cache.misses
+    # convert the pages in the background while recognizing them
+    producer = PageProducer(
+        scan_pdf(path_to_pdf, temp_folder, dpi, cov_format, engine, setup,
+                 tracker, keep_images=keep_images, page_index=page_index),
+        RASTER_QUEUE_DEPTH)
+    # the setup entries that need each page
+    needed = {}
+    for n, (_, _, _, beg, end, _) in enumerate(setup):
+        for i in range(beg, end + 1):
+            needed.setdefault(i, []).append(n)
+    langs = [parm.get(ADDI_PARM_LANG, default_lang)
+             for _, _, _, _, _, parm in setup]
+    crops = [parm.get(ADDI_PARM_CROP, None) for _, _, _, _, _, parm in setup]
+    methods = [parm.get(ADDI_PARM_BINARIZE, DEFAULT_BINARIZE)
+               for _, _, _, _, _, parm in setup]
+    # submitted jobs that are not written yet, { (entry, page): job }
+    jobs = {}
+    # where each page comes from, the images themselves are not kept
+    page_num_map = {}
+    in_flight = 2 * max(ocr_worker, 1)
+    # recognitions saved by overlapping rows
+    saved = [0]
 
     # Use OCR on the images
-    with PyTessBaseAPI(path=tessdata_path, lang=default_lang) as api:
-        total_conf = 0
-        for title, cat, sort, beg, end, parm in setup:
-            if "LANG" in parm:
-                api.InitFull(path=tessdata_path, lang=parm["LANG"])
-            image_crop_pram = parm.get("CROP", None)
-            # create a txt file that include all data in this page
-            name = "{}_{}_{}_{}.txt".format(DATA_PREFIX, sort, cat, title)
-            content_path = join(data_folder, name)
-            tracker.log("   正在识别 [lang={}] {}".format(
-                api.GetInitLanguagesAsString(), title), prt=True)
-            with open(content_path, "w+", encoding="utf8") as f:
-                # write header
-                f.write("# 可信度 | 行内容 （请校对识别内容，特别注意带有 ？ 的行）\n")
-                tracker.update_disc_fill("识别 {} <{}>".format(title, cat))
-                total_page_conf = 0
-                for i in range(beg, end + 1):
-                    page_path = page_num_map[i]
-                    content = get_content(api, page_path,
-                                          image_crop_pram,
-                                          tracker)
-                    if len(content) != 0:
-                        avg_conf = sum(conf for _, conf in content) / len(
-                            content)
+    tracker.log("   识别 pdf [ocr_worker={}, queue_depth={}]".format(
+        ocr_worker, RASTER_QUEUE_DEPTH), prt=True)
+    producer.start()
+    try:
+        with OCRPool(tessdata_path, ocr_worker, ocr_cache) as pool:
+            def receive() -> bool:
+                """取出一个转换好的页面，为需要该页的条目提交任务"""
+                item = producer.get()
+                if item is None:
+                    return False
+                page, image = item
+                page_num_map[page] = abspath(image) \
+                    if isinstance(image, str) else "{} [页码={}]".format(
+                        abspath(path_to_pdf), page)
+                # rows sharing (crop, lang, binarize) share one recognition
+                shared = {}
+                for entry in needed.get(page, []):
+                    signature = (crops[entry], langs[entry], methods[entry])
+                    if signature in shared:
+                        saved[0] += 1
                     else:
-                        avg_conf = 0
-                    total_page_conf += avg_conf
-                    # write a div for easy identify
-                    f.write(
-                        "#" + " 页码: {0:}, 平均可信度: {1:3.2f} ".format(
-                            i, avg_conf).center(FORMAT_LENGTH, "=") + "\n"
-                    )
-                    # write the path of this page
-                    f.write("#文件地址: {}\n".format(abspath(page_path)))
-                    for text, conf in content:
-                        indi = "?" if conf < avg_conf else " "
+                        shared[signature] = _SharedJob(pool.submit(
+                            image, crops[entry], langs[entry],
+                            methods[entry]))
+                    jobs[(entry, page)] = shared[signature]
+                return True
+
+            def job_for(entry: int, page: int):
+                """
+                返回一页的任务，等待之前先让识别进程保持忙碌；
+                页面按照取用的顺序到达，所以最多提前接收 in_flight 页
+                """
+                while (entry, page) not in jobs or len(jobs) < in_flight:
+                    if not receive():
+                        break
+                if (entry, page) not in jobs:
+                    raise ValueError("无法转换 {} 的第 {} 页".format(
+                        path_to_pdf, page))
+                return jobs.pop((entry, page))
+
+            # collect the result in page order
+            total_conf = 0
+            api_init_times = []
+            for entry, (title, cat, sort, beg, end, parm) in enumerate(setup):
+                # create a txt file that include all data in this page
+                name = "{}_{}_{}_{}.txt".format(DATA_PREFIX, sort, cat, title)
+                content_path = join(data_folder, name)
+                tracker.log("   正在识别 [lang={}] {}".format(
+                    langs[entry], title), prt=True)
+                with open(content_path, "w+", encoding="utf8") as f:
+                    # write header
+                    f.write("# 可信度 | 行内容 （请校对识别内容，特别注意带有 ？ 的行）\n")
+                    tracker.update_disc_fill("识别 {} <{}>".format(title, cat))
+                    total_page_conf = 0
+                    for i in range(beg, end + 1):
+                        content, messages, init_times = job_for(
+                            entry, i).result()
+                        api_init_times += init_times
+                        for message, tp in messages:
+                            tracker.log(message, tp=tp)
+                        if len(content) != 0:
+                            avg_conf = sum(conf for _, conf in content) / len(
+                                content)
+                        else:
+                            avg_conf = 0
+                        total_page_conf += avg_conf
+                        # write a div for easy identify
                         f.write(
-                            "{0:s} {1:3.2f} | {2:}\n".format(indi, conf, text)
+                            "#" + " 页码: {0:}, 平均可信度: {1:3.2f} ".format(
+                                i, avg_conf).center(FORMAT_LENGTH, "=") + "\n"
                         )
-                    tracker.tick()
-                total_page = end - beg + 1
-                pg_avg_conf = 0 if total_page == 0 else \
-                    total_page_conf / total_page
-                f.write("#" + "总体平均可信度 : {:3.2f}".format(pg_avg_conf).center(
-                    FORMAT_LENGTH, "="))
-                total_conf += pg_avg_conf
-        total_avg_conf = 0 if len(setup) == 0 else total_conf / len(setup)
-        tracker.log("总体平均可信度 : {}".format(total_avg_conf), prt=True)
-
-
-def get_content(api, img_path: str,
-                image_crop_pram: Tuple[int, int, int, int], tracker) -> \
+                        # write the path of this page
+                        f.write("#文件地址: {}\n".format(page_num_map[i]))
+                        for text, conf in content:
+                            indi = "?" if conf < avg_conf else " "
+                            f.write(
+                                "{0:s} {1:3.2f} | {2:}\n".format(
+                                    indi, conf, text)
+                            )
+                        tracker.tick()
+                    total_page = end - beg + 1
+                    pg_avg_conf = 0 if total_page == 0 else \
+                        total_page_conf / total_page
+                    f.write("#" + "总体平均可信度 : {:3.2f}".format(
+                        pg_avg_conf).center(FORMAT_LENGTH, "="))
+                    total_conf += pg_avg_conf
+            total_avg_conf = 0 if len(setup) == 0 else total_conf / len(setup)
+            tracker.log("总体平均可信度 : {}".format(total_avg_conf), prt=True)
+            tracker.log("   Tesseract 初始化 {} 次, 用时 {:.2f}s".format(
+                len(api_init_times), sum(api_init_times)), prt=True)
+            if saved[0] != 0:
+                tracker.log("   重叠的页面只识别一次, 节省 {} 次识别".format(
+                    saved[0]), prt=True)
+    finally:
+        producer.halt()
+    if ocr_cache is not None:
+        tracker.log("   OCR 缓存命中 [hit={}, miss={}]".format(
+            ocr_cache.hits - hits, ocr_cache.misses - misses), prt=True)
+
+
+class TessAPIPool:
+    """
+    已经初始化的 PyTessBaseAPI, 键为 (tessdata, 语言),
+    最多保留 size 个, 超过时结束最久没有使用的 API
+
+    成员变量如下：
+    === 私有变量 ===
+    _apis: { (tessdata, 语言): PyTessBaseAPI }, 最久没有使用的在前
+    _size: 最多保留的 API 个数
+    _init_times: 还没有被取走的每次初始化的用时（秒）
+    """
+
+    def __init__(self, size: int) -> None:
+        self._apis = OrderedDict()
+        self._size = max(size, 1)
+        self._init_times = []
+
+    def get(self, tessdata_path: str, lang: str):
+        """返回该语言的 API, 没有时初始化一个"""
+        key = (tessdata_path, lang)
+        api = self._apis.get(key)
+        if api is not None:
+            self._apis.move_to_end(key)
+            return api
+        from tesserocr import PyTessBaseAPI
+        start = time.perf_counter()
+        api = PyTessBaseAPI(path=tessdata_path, lang=lang)
+        self._init_times.append(time.perf_counter() - start)
+        self._apis[key] = api
+        while len(self._apis) > self._size:
+            _, oldest = self._apis.popitem(last=False)
+            oldest.End()
+        return api
+
+    def take_init_times(self) -> List[float]:
+        """返回并清空上次调用之后每次初始化的用时"""
+        init_times, self._init_times = self._init_times, []
+        return init_times
+
+    def close(self) -> None:
+        for api in self._apis.values():
+            api.End()
+        self._apis.clear()
+
+
+# the tesseract apis owned by this process
+_OCR_API_POOL = None
+_OCR_TESSDATA_PATH = None
+
+
+def _init_ocr_worker(tessdata_path: str) -> None:
+    """初始化 OCR 进程, 每个进程最多保留 OCR_API_POOL_SIZE 种语言的 PyTessBaseAPI"""
+    global _OCR_API_POOL, _OCR_TESSDATA_PATH
+    _OCR_TESSDATA_PATH = tessdata_path
+    _OCR_API_POOL = TessAPIPool(OCR_API_POOL_SIZE)
+
+
+def _end_ocr_worker() -> None:
+    if _OCR_API_POOL is not None:
+        _OCR_API_POOL.close()
+
+
+def _ocr_page(page,
+              image_crop_pram: Tuple[int, int, int, int],
+              lang: str,
+              method: Tuple = DEFAULT_BINARIZE) -> \
+        Tuple[List[Tuple[str, float]], List[Tuple[str, int]], List[float]]:
+    """
+    识别一页（图像地址或者 PIL 图像）,
+    返回识别内容, 需要记录的日志, 以及识别这一页时初始化 API 的用时
+    """
+    api = _OCR_API_POOL.get(_OCR_TESSDATA_PATH, lang)
+    log = _WorkerLog()
+    content = get_content(api, page, image_crop_pram, log, method)
+    return content, log.messages, _OCR_API_POOL.take_init_times()
+
+
+class _WorkerLog:
+    """在 OCR 进程里代替 tracker, 日志会被送回主进程记录"""
+
+    def __init__(self) -> None:
+        self.messages = []
+
+    def log(self, message: str, tp=TRACKER_LOG_INFO, **kwargs) -> None:
+        exc_info = kwargs.get("exc_info", None)
+        if exc_info is not None:
+            message = "{} [error='{}']".format(message, exc_info)
+        self.messages.append((message, tp))
+
+
+class _DeferredJob:
+    """在当前进程中识别时使用, 调用 result 时才进行识别"""
+
+    def __init__(self, func, *args) -> None:
+        self._func = func
+        self._args = args
+
+    def result(self):
+        return self._func(*self._args)
+
+
+class _CachedJob:
+    """缓存命中时使用, 直接返回缓存的识别结果"""
+
+    def __init__(self, content) -> None:
+        self._content = content
+
+    def result(self):
+        return self._content, [], []
+
+
+class _CachingJob:
+    """缓存没有命中时使用, 取得识别结果时写入缓存"""
+
+    def __init__(self, job, cache: OCRCache, key: str) -> None:
+        self._job = job
+        self._cache = cache
+        self._key = key
+
+    def result(self):
+        content, messages, init_times = self._job.result()
+        if self._key is not None:
+            self._cache.put(self._key, content)
+            self._key = None
+        return content, messages, init_times
+
+
+class _SharedJob:
+    """多个条目需要同一页的同一识别结果时使用, 只识别一次, 日志只返回一次"""
+
+    def __init__(self, job) -> None:
+        self._job = job
+        self._result = None
+
+    def result(self):
+        if self._result is None:
+            self._result = self._job.result()
+            return self._result
+        content, _, _ = self._result
+        return content, [], []
+
+
+class OCRPool:
+    """
+    OCR 进程池, 每一页作为独立的任务分配给各个进程
+
+    每个进程拥有自己的 PyTessBaseAPI,
+    当 workers <= 1 时在当前进程中依次识别,
+    提供 cache 时会先查找缓存, 命中的页面不会再次识别
+    """
+
+    def __init__(self, tessdata_path: str, workers: int,
+                 cache: Optional[OCRCache] = None) -> None:
+        self._tessdata_path = tessdata_path
+        self._cache = cache
+        self._pending = []
+        if workers > 1:
+            self._executor = ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_ocr_worker,
+                initargs=(tessdata_path,),
+            )
+        else:
+            self._executor = None
+            _init_ocr_worker(tessdata_path)
+
+    def submit(self, page,
+               image_crop_pram: Tuple[int, int, int, int], lang: str,
+               method: Tuple = DEFAULT_BINARIZE):
+        """提交一页（图像地址或者 PIL 图像）"""
+        if self._cache is None:
+            return self._submit(page, image_crop_pram, lang, method)
+        key = self._cache.make_key(page, image_crop_pram, lang,
+                                   self._tessdata_path, method)
+        content = self._cache.get(key)
+        if content is not None:
+            return _CachedJob(content)
+        return _CachingJob(self._submit(page, image_crop_pram, lang, method),
+                           self._cache, key)
+
+    def _submit(self, page,
+                image_crop_pram: Tuple[int, int, int, int], lang: str,
+                method: Tuple):
+        if self._executor is None:
+            return _DeferredJob(_ocr_page, page, image_crop_pram, lang,
+                                method)
+        future = self._executor.submit(_ocr_page, page, image_crop_pram,
+                                       lang, method)
+        self._pending.append(future)
+        return future
+
+    def close(self, cancel: bool = False) -> None:
+        if self._executor is None:
+            _end_ocr_worker()
+            return
+        if cancel:
+            # do not wait for the pages nobody is going to read
+            for future in self._pending:
+                future.cancel()
+        self._executor.shutdown(wait=True)
+        self._pending = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close(cancel=exc_type is not None)
+
+
+def get_content(api, page,
+                image_crop_pram: Tuple[int, int, int, int], tracker,
+                method: Tuple = DEFAULT_BINARIZE) -> \
         List[Tuple[str, float]]:
+    """识别一页，page 为图像地址或者 PIL 图像，method 为二值化方法"""
+    from PIL import Image
+    from tesserocr import RIL, iterate_level
+    start = time.perf_counter()
     # first we do some pre-processing on the image
-    img = Image.open(img_path)
-    # convert to gray scale and apply binarization
-    img = img.convert("L").point(lambda x: 0 if x < 180 else 255, "1")
+    img = Image.open(page) if isinstance(page, str) else page
+    # crop first, so only the kept pixels are converted
     if image_crop_pram is not None:
         img = img.crop(image_crop_pram)
+    # convert to gray scale and apply binarization
+    img = binarize(img.convert("L"), method)
+    prepared = time.perf_counter()
     # use tesseract to recognize the texts
     api.SetImage(img)
     api.Recognize()
+    tracker.log("   页面预处理 {:.0f}ms, 识别 {:.0f}ms [binarize={}]".format(
+        (prepared - start) * 1000, (time.perf_counter() - prepared) * 1000,
+        "/".join(str(m) for m in method)))
     # build the data
     page_text = []
     ri = api.GetIterator()
@@ -262,17 +669,3 @@ def get_content(api, img_path: str,
             tracker.log("No text Returned on this line.", tp=TRACKER_LOG_ERROR,
                         exc_info=e)
     return page_text
-
-
-def extract_page_number(path: str) -> int:
-    name = str(basename(path).rsplit(".", maxsplit=1)[0])
-    return int(name.split("-")[2])
-
-
-def extract_info(path: str) -> Optional[Tuple[str, int, int, str]]:
-    name, format_ = splitext(basename(path))
-    seg = name.split("-")
-    if len(seg) != 3:
-        return None
-    prefix, dpi, page_number = seg
-    return str(prefix), int(dpi), int(page_number), str(format_)
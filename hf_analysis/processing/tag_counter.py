@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+
+"""
+多模式匹配模块，使用 Aho-Corasick 自动机扫描一次文章即可统计所有词汇的出现次数
+"""
+from collections import deque
+from typing import Dict, Iterable, List, Tuple
+
+
+class TagCounter:
+    """
+    由所有词汇构建的 Aho-Corasick 自动机，构建一次后可以重复用于每篇文章
+
+    成员变量如下：
+    === 私有变量 ===
+    _tags: 词汇列表，词汇编号即为其在列表中的位置
+    _lengths: 每个词汇的长度
+    _goto: 每个状态的转移表
+    _fail: 每个状态的失败指针
+    _output: 每个状态匹配到的词汇编号（包括经由失败指针可达的词汇）
+    """
+    _tags: List[str]
+    _lengths: List[int]
+    _goto: List[Dict[str, int]]
+    _fail: List[int]
+    _output: List[Tuple[int, ...]]
+
+    def __init__(self, tags: Iterable[str]) -> None:
+        """初始化 TagCounter，构建自动机"""
+        self._tags = list(dict.fromkeys(tags))
+        self._lengths = [len(tag) for tag in self._tags]
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [()]
+        # build the trie
+        for index, tag in enumerate(self._tags):
+            if len(tag) == 0:
+                continue
+            state = 0
+            for char in tag:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append(())
+                state = next_state
+            self._output[state] += (index,)
+        # build the failure links breadth first
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail != 0 and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail = self._goto[fail].get(char, 0)
+                self._fail[next_state] = fail
+                self._output[next_state] += self._output[fail]
+
+    @property
+    def tags(self) -> List[str]:
+        """返回所有的词汇，顺序与 count_list 的结果相同"""
+        return list(self._tags)
+
+    def count_list(self, text: str, overlapping: bool = False) -> List[int]:
+        """
+        扫描一次文章，返回每个词汇的出现次数
+
+        参数列表如下：
+        :param text: 文章本身
+        :param overlapping: 是否统计互相重叠的出现，
+                            为 False 时与 str.count 的结果相同
+
+        返回参数如下：
+        :return: 一个列表，顺序与 tags 相同
+        """
+        goto, fail, output = self._goto, self._fail, self._output
+        lengths = self._lengths
+        counts = [0] * len(self._tags)
+        # the earliest position where the next match of each tag may start
+        next_start = [0] * len(self._tags)
+        state = 0
+        for pos, char in enumerate(text):
+            while state != 0 and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for index in output[state]:
+                if overlapping:
+                    counts[index] += 1
+                elif pos - lengths[index] + 1 >= next_start[index]:
+                    counts[index] += 1
+                    next_start[index] = pos + 1
+        return counts
+
+    def count(self, text: str, overlapping: bool = False) -> Dict[str, int]:
+        """扫描一次文章，返回一个字典，键为词汇，值为词汇在文章里出现的次数"""
+        return dict(zip(self._tags, self.count_list(text, overlapping)))
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+
+"""
+分词结果缓存模块，文章与词典没有变化时，更换提取器或者提取参数不需要重新分词
+"""
+import hashlib
+import pickle
+from array import array
+from itertools import accumulate
+from os import getpid, listdir, makedirs, remove, replace, stat, utime
+from os.path import exists, join
+from typing import Optional
+
+# bump this when the layout of a cached cut changes
+CACHE_VERSION = 1
+
+CACHE_SUFFIX = ".cut"
+
+PICKLE_PROTOCOL = 4
+
+
+class TokenCache:
+    """
+    以 (文章内容, 词典快照的键, 是否标注词性) 的哈希为键的 jieba 分词结果缓存
+
+    每篇文章的分词结果保存为缓存文件夹中的一个文件，文件中只保存每个词的长度
+    （uint32 数组）以及词性在词性表中的编号（uint8 数组），读取时从文章本身切出词汇；
+    多个抽取进程可以同时读写缓存，淘汰由 trim 在抽取结束之后进行
+
+    成员变量如下：
+    === 私有变量 ===
+    _folder: 缓存文件夹
+    """
+
+    def __init__(self, folder: str) -> None:
+        """初始化 TokenCache"""
+        self._folder = folder
+        if not exists(folder):
+            makedirs(folder, exist_ok=True)
+
+    @staticmethod
+    def make_key(article: str, dictionary_key: str, pos: bool) -> str:
+        """计算一篇文章的缓存键，dictionary_key 为 TokenizerSnapshot 的键"""
+        digest = hashlib.sha256()
+        digest.update(repr((CACHE_VERSION, dictionary_key, pos)).encode(
+            "utf8"))
+        digest.update(article.encode("utf8"))
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return join(self._folder, key + CACHE_SUFFIX)
+
+    def get(self, key: str, article: str) -> Optional[list]:
+        """
+        返回缓存的分词结果，没有缓存时返回 None
+
+        标注词性时返回 [jieba.posseg.pair, ...]，否则返回 [词, ...]
+        """
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                version, lengths, table, flags = pickle.load(f)
+            # mark it as recently used
+            utime(path)
+        except Exception:
+            # a missing or broken entry is the same as no entry
+            return None
+        if version != CACHE_VERSION:
+            return None
+        bounds = [0]
+        bounds.extend(accumulate(lengths))
+        if bounds[-1] != len(article):
+            return None
+        words = [article[a:b] for a, b in zip(bounds, bounds[1:])]
+        if table is None:
+            return words
+        from jieba.posseg import pair
+        return [pair(word, table[i]) for word, i in zip(words, flags)]
+
+    def put(self, key: str, article: str, tokens: list) -> None:
+        """保存分词结果，tokens 与 get 返回的格式相同"""
+        pos = len(tokens) != 0 and hasattr(tokens[0], "flag")
+        words = [token.word for token in tokens] if pos else tokens
+        # only a cut that covers the article can be rebuilt from it
+        if "".join(words) != article:
+            return
+        lengths = array("I", map(len, words))
+        table, flags = None, None
+        if pos:
+            index = {}
+            ids = [index.setdefault(token.flag, len(index))
+                   for token in tokens]
+            table = list(index)
+            flags = array("B" if len(table) <= 256 else "H", ids)
+        path = self._path(key)
+        # unique per process, several workers may write the same entry
+        temp_path = "{}.{}.tmp".format(path, getpid())
+        with open(temp_path, "wb") as f:
+            pickle.dump((CACHE_VERSION, lengths, table, flags), f,
+                        protocol=PICKLE_PROTOCOL)
+        replace(temp_path, path)
+
+    def trim(self, size_limit: int) -> int:
+        """淘汰最久没有使用的结果，直到缓存总大小不超过 size_limit，返回淘汰的个数"""
+        found = []
+        for f in listdir(self._folder):
+            if not f.endswith(CACHE_SUFFIX):
+                continue
+            try:
+                st = stat(join(self._folder, f))
+            except OSError:
+                continue
+            found.append((st.st_mtime, st.st_size, f))
+        found.sort()
+        size = sum(s for _, s, _ in found)
+        removed = 0
+        for _, s, f in found:
+            if size <= size_limit:
+                break
+            try:
+                remove(join(self._folder, f))
+            except OSError:
+                pass
+            size -= s
+            removed += 1
+        return removed
+
+
+class ReplayTokenizer:
+    """
+    包装提取器使用的分词器，cut 的结果保存在 TokenCache 中，
+    文章与词典没有变化时直接返回保存的结果
+
+    成员变量如下：
+    === 私有变量 ===
+    _tokenizer: 被包装的分词器（jieba.Tokenizer 或者 POSTokenizer）
+    _cache: 分词结果缓存
+    _dictionary_key: 分词器词典快照的键
+    _pos: 被包装的分词器是否标注词性
+    """
+
+    def __init__(self, tokenizer, cache: TokenCache, dictionary_key: str,
+                 pos: bool) -> None:
+        """初始化 ReplayTokenizer"""
+        self._tokenizer = tokenizer
+        self._cache = cache
+        self._dictionary_key = dictionary_key
+        self._pos = pos
+
+    def cut(self, sentence, *args, **kwargs):
+        if len(args) != 0 or len(kwargs) != 0:
+            # only the default cut used by the extractors is cached
+            return self._tokenizer.cut(sentence, *args, **kwargs)
+        key = self._cache.make_key(sentence, self._dictionary_key, self._pos)
+        tokens = self._cache.get(key, sentence)
+        if tokens is None:
+            tokens = list(self._tokenizer.cut(sentence))
+            self._cache.put(key, sentence, tokens)
+        return iter(tokens)
+
+    def __getattr__(self, name):
+        return getattr(self._tokenizer, name)
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+
+"""
+jieba 词典快照模块，保存装载了 建议/白名单/黑名单 词汇之后的分词器词典，
+词汇没有变化时不需要重新解析词典与逐个装载词汇
+"""
+import hashlib
+import pickle
+from os import listdir, makedirs, remove, replace, stat, utime
+from os.path import exists, join
+from typing import List
+
+# bump this when the layout of the snapshot changes
+SNAPSHOT_VERSION = 1
+
+SNAPSHOT_SUFFIX = ".pkl"
+
+PICKLE_PROTOCOL = 4
+
+
+class TokenizerSnapshot:
+    """
+    以词汇列表哈希为键的 jieba 分词器快照
+
+    快照保存分词器的前缀词典（FREQ）、总词频（total）与自定义词性表，
+    装载词汇的结果与装载的顺序有关，所以键包括三个词汇列表本身的顺序，
+    文件夹中最多保留 keep 个快照，淘汰最久没有使用的快照
+
+    成员变量如下：
+    === 私有变量 ===
+    _folder: 快照文件夹
+    _keep: 最多保留的快照个数
+    """
+
+    def __init__(self, folder: str, keep: int) -> None:
+        """初始化 TokenizerSnapshot"""
+        self._folder = folder
+        self._keep = keep
+
+    @staticmethod
+    def make_key(suggestion_word: List[str],
+                 whitelist_word: List[str],
+                 blacklist_word: List[str]) -> str:
+        """计算快照的键"""
+        import jieba
+        digest = hashlib.sha256()
+        digest.update(repr((
+            SNAPSHOT_VERSION,
+            jieba.__version__,
+            list(suggestion_word),
+            list(whitelist_word),
+            list(blacklist_word),
+        )).encode("utf8"))
+        return digest.hexdigest()
+
+    def path(self, key: str) -> str:
+        return join(self._folder, key + SNAPSHOT_SUFFIX)
+
+    def exists(self, key: str) -> bool:
+        return exists(self.path(key))
+
+    def load(self, key: str, blacklist_word: List[str]):
+        """返回快照中的分词器，没有快照或者快照损坏时返回 None"""
+        import jieba
+        path = self.path(key)
+        if not exists(path):
+            return None
+        try:
+            with open(path, "rb") as f:
+                version, freq, total, word_tag = pickle.load(f)
+            # mark it as recently used
+            utime(path)
+        except Exception:
+            # a broken snapshot is the same as no snapshot
+            return None
+        if version != SNAPSHOT_VERSION:
+            return None
+        jieba_instant = jieba.Tokenizer()
+        jieba_instant.FREQ = freq
+        jieba_instant.total = total
+        jieba_instant.user_word_tag_tab = word_tag
+        jieba_instant.initialized = True
+        # del_word also tells the hmm segmenter not to join these words,
+        # that state lives in jieba.finalseg instead of the tokenizer
+        for word in blacklist_word:
+            jieba.finalseg.add_force_split(word)
+        return jieba_instant
+
+    def save(self, key: str, jieba_instant) -> None:
+        """保存分词器，并淘汰最久没有使用的快照"""
+        if not exists(self._folder):
+            makedirs(self._folder)
+        path = self.path(key)
+        temp_path = path + ".tmp"
+        with open(temp_path, "wb") as f:
+            pickle.dump((SNAPSHOT_VERSION, jieba_instant.FREQ,
+                         jieba_instant.total,
+                         jieba_instant.user_word_tag_tab),
+                        f, protocol=PICKLE_PROTOCOL)
+        replace(temp_path, path)
+        found = sorted(
+            (stat(join(self._folder, f)).st_mtime, f)
+            for f in listdir(self._folder) if f.endswith(SNAPSHOT_SUFFIX)
+        )
+        for _, f in found[:max(0, len(found) - self._keep)]:
+            try:
+                remove(join(self._folder, f))
+            except OSError:
+                pass
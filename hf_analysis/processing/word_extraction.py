@@ -1,12 +1,20 @@
 # -*- coding: utf-8 -*-
 
 # 引用必要库
-from typing import Dict, List
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
 
-import jieba.analyse
-import jieba.posseg
-
-from hf_analysis.parameter import EXTRACTOR, TEXT_RANK
+from hf_analysis.parameter import ARTIFACT_EXTRACTION, \
+    ARTIFACT_TOKEN_COUNTS, CORPUS_BATCH_SIZE, EXTRACTION_CHUNK_SIZE, \
+    EXTRACTION_WORKER, EXTRACTOR, TEXT_RANK, TF_IDF_CORPUS, \
+    TOKEN_CACHE_SIZE_LIMIT, TOKENIZER_SNAPSHOT_KEEP
+from hf_analysis.processing.artifact import ArtifactStore, fingerprint
+from hf_analysis.processing.idf_store import IdfStore, article_digest, \
+    corpus_fingerprint
+from hf_analysis.processing.tag_counter import TagCounter
+from hf_analysis.processing.token_cache import ReplayTokenizer, TokenCache
+from hf_analysis.processing.tokenizer_snapshot import TokenizerSnapshot
 
 
 def extract(article_name: str,
@@ -43,54 +51,164 @@ def extract(article_name: str,
     :return: 返回一个字典，键为关键词，值为关键词出现在文章里出现的次数
     """
     tracker.update_disc_fill("抽取 {}".format(article_name))
+    tags = extract_tags(article, extractor, allowPOS, num_wanted)
+    summary = filter_tags(tags, whitelist_word, blacklist_word)
+    tracker.tick()
+    return summary
+
+
+def extract_tags(article: str,
+                 extractor,
+                 allowPOS,
+                 num_wanted: int = None) -> List[Tuple[str, float]]:
+    """使用提取器抽取关键词，返回 [(关键词, 权重), ...]"""
     if num_wanted is not None and num_wanted <= 0:
         num_wanted = None
     # use jieba.analyse (tf-idf) or (TextRank)
-    tags = extractor.extract_tags(
+    return extractor.extract_tags(
         sentence=article, topK=num_wanted, withWeight=True,
         allowPOS=allowPOS
     )
+
+
+class TokenRecorder:
+    """
+    包装提取器使用的分词器，记录 cut 切分出的每个词汇的出现次数，
+    抽取关键词的同时得到文章的词频表，不需要再次扫描文章
+
+    成员变量如下：
+    === 私有变量 ===
+    _tokenizer: 被包装的分词器（jieba.Tokenizer 或者 POSTokenizer）
+    _counts: 记录词频的 Counter
+    """
+
+    def __init__(self, tokenizer, counts: Counter) -> None:
+        """初始化 TokenRecorder"""
+        self._tokenizer = tokenizer
+        self._counts = counts
+
+    def cut(self, sentence, *args, **kwargs):
+        for token in self._tokenizer.cut(sentence, *args, **kwargs):
+            # the pos tokenizer yields pairs of (word, flag)
+            self._counts[getattr(token, "word", token)] += 1
+            yield token
+
+    def __getattr__(self, name):
+        return getattr(self._tokenizer, name)
+
+
+def extract_counted_tags(article: str,
+                         extractor,
+                         allowPOS,
+                         num_wanted: int = None) -> \
+        Tuple[List[Tuple[str, float]], Dict[str, int]]:
+    """抽取关键词，同时返回分词结果中每个词汇的出现次数 { 词汇: 次数 }"""
+    counts = Counter()
+    tokenizer, postokenizer = extractor.tokenizer, extractor.postokenizer
+    # the extractor cuts the article exactly once, with one of the two
+    extractor.tokenizer = TokenRecorder(tokenizer, counts)
+    extractor.postokenizer = TokenRecorder(postokenizer, counts)
+    try:
+        tags = extract_tags(article, extractor, allowPOS, num_wanted)
+    finally:
+        extractor.tokenizer = tokenizer
+        extractor.postokenizer = postokenizer
+    return tags, dict(counts)
+
+
+def _extract_article(article: str,
+                     extractor,
+                     allowPOS,
+                     num_wanted: int,
+                     count_tokens: bool) -> \
+        Tuple[List[Tuple[str, float]], Optional[Dict[str, int]]]:
+    if count_tokens:
+        return extract_counted_tags(article, extractor, allowPOS, num_wanted)
+    return extract_tags(article, extractor, allowPOS, num_wanted), None
+
+
+def _extract_articles(articles: List[str],
+                      extractor,
+                      allowPOS,
+                      num_wanted: int,
+                      count_tokens: bool) -> \
+        List[Tuple[List[Tuple[str, float]], Optional[Dict[str, int]]]]:
+    """抽取一组文章，提取器支持 extract_corpus 时一次抽取整组文章"""
+    if not hasattr(extractor, "extract_corpus"):
+        return [_extract_article(article, extractor, allowPOS, num_wanted,
+                                 count_tokens)
+                for article in articles]
+    if num_wanted is not None and num_wanted <= 0:
+        num_wanted = None
+    counts = [] if count_tokens else None
+    tags = extractor.extract_corpus(articles, topK=num_wanted,
+                                    withWeight=True, allowPOS=allowPOS,
+                                    token_counts=counts)
+    if counts is None:
+        return [(article_tags, None) for article_tags in tags]
+    return list(zip(tags, counts))
+
+
+def filter_tags(tags: List[Tuple[str, float]],
+                whitelist_word: List[str],
+                blacklist_word: List[str]) -> Dict[str, float]:
+    """加入白名单词汇，去除黑名单词汇"""
     # add whitelist word
-    tags += [(w, None) for w in whitelist_word if w not in tags]
+    tags = tags + [(w, None) for w in whitelist_word if w not in tags]
     # remove blacklist word
-    summary = {
+    return {
         tag: weight
         for tag, weight in tags if tag not in blacklist_word
     }
-    tracker.tick()
-    return summary
 
 
-def summarise(data: Dict[str, Dict[str, str]],
-              suggestion_word: List[str],
-              whitelist_word: List[str],
-              blacklist_word: List[str],
-              tracker,
-              allowPOS,
-              num_wanted: int,
-              extractor) -> \
-        Dict[str, Dict[str, Dict[str, float]]]:
+def build_tokenizer(suggestion_word: List[str],
+                    whitelist_word: List[str],
+                    blacklist_word: List[str],
+                    tracker=None,
+                    snapshot_folder: Optional[str] = None):
     """
-    总结所有的关键词汇
+    创建 jieba 分词器，并装载 建议/白名单/黑名单 词汇，tracker 为 None 时不输出日志
 
-    参数列表如下：
-    :param data: 数据
-    :param suggestion_word: 建议关键词列表
-    :param whitelist_word: 想要一定出现的关键词列表
-    :param blacklist_word: 想要一定不出现的关键词列表
-    :param tracker: 追踪器
-    :param num_wanted: 想要的关键词的个数
-    :param extractor: 用做提取器的算法，应该为（TF_IDF 或者 TEXT_RANK)
-    :param allowPOS: 词性
+    提供 snapshot_folder 时，词汇没有变化则直接读取上次保存的词典快照，
+    否则装载词汇之后保存快照
     """
-    # init the tracker
-    # the total progress contains:
-    #       each article in each year
-    total_article_count = sum(
-        1 for cat in data.values() for _ in cat
-    )
-    tracker.log("正在初始化 jieba 中文分词库", prt=True)
+    snapshot, key = None, None
+    if snapshot_folder is not None:
+        snapshot = TokenizerSnapshot(snapshot_folder, TOKENIZER_SNAPSHOT_KEEP)
+        key = snapshot.make_key(suggestion_word, whitelist_word,
+                                blacklist_word)
+        jieba_instant = snapshot.load(key, blacklist_word)
+        if jieba_instant is not None:
+            if tracker is not None:
+                tracker.log("已读取 jieba 词典快照 [snapshot={}]".format(
+                    snapshot.path(key)), prt=True)
+            return jieba_instant
+    jieba_instant = _load_words(suggestion_word, whitelist_word,
+                                blacklist_word, tracker)
+    if snapshot is not None:
+        # without any word the dictionary is not parsed yet
+        jieba_instant.check_initialized()
+        snapshot.save(key, jieba_instant)
+        if tracker is not None:
+            tracker.log("已保存 jieba 词典快照 [snapshot={}]".format(
+                snapshot.path(key)), prt=True)
+    return jieba_instant
+
+
+def _load_words(suggestion_word: List[str],
+                whitelist_word: List[str],
+                blacklist_word: List[str],
+                tracker):
+    import jieba
     jieba_instant = jieba.Tokenizer()
+    if tracker is None:
+        for word in suggestion_word + whitelist_word:
+            jieba_instant.add_word(word)
+        for word in blacklist_word:
+            jieba_instant.del_word(word)
+        return jieba_instant
+    tracker.log("正在初始化 jieba 中文分词库", prt=True)
     # apply the suggestion word to jieba
     tracker.log("   正在装载 建议词汇 [word=[{},+{}个]]".format(
         ",".join(suggestion_word[:10]),
@@ -112,24 +230,546 @@ def summarise(data: Dict[str, Dict[str, str]],
         prt=True)
     for word in blacklist_word:
         jieba_instant.del_word(word)
-    tracker.log("   正在抽取关键词汇", prt=True)
-    tracker.init_ticker("    进程", "正在抽取词汇", 0, total_article_count)
-    # extract the important word segment
+    return jieba_instant
+
+
+def build_extractor(extractor: str, jieba_instant,
+                    token_cache_folder: Optional[str] = None,
+                    dictionary_key: Optional[str] = None,
+                    idf: Optional[Tuple[Dict[str, float], float]] = None):
+    """
+    创建提取器，使用给定的分词器
+
+    提供 token_cache_folder 时，分词结果保存在分词缓存中，
+    文章与词典（dictionary_key）没有变化时不再重新分词，
+    TF-IDF 与 TextRank 共用标注词性的分词结果；
+    提供 idf 时 TF-IDF 使用这个 (IDF 表, IDF 中位数) 代替 jieba 自带的 IDF 表
+    """
+    import jieba.posseg
     word_extractor = EXTRACTOR[extractor]()
+    tokenizer = jieba_instant
+    pos_tokenizer = jieba.posseg.POSTokenizer(jieba_instant)
+    if token_cache_folder is not None:
+        cache = TokenCache(token_cache_folder)
+        tokenizer = ReplayTokenizer(tokenizer, cache, dictionary_key, False)
+        pos_tokenizer = ReplayTokenizer(pos_tokenizer, cache, dictionary_key,
+                                        True)
+    # TextRank always cuts with pos, TF-IDF only with allowPOS,
+    # both have to see the customised dictionary
     if extractor in [TEXT_RANK]:
-        word_extractor.tokenizer = jieba.posseg.POSTokenizer(jieba_instant)
+        word_extractor.tokenizer = pos_tokenizer
     else:
-        word_extractor.tokenizer = jieba_instant
+        word_extractor.tokenizer = tokenizer
+    word_extractor.postokenizer = pos_tokenizer
+    if idf is not None:
+        word_extractor.idf_freq, word_extractor.median_idf = idf
+    return word_extractor
+
+
+# the extractor of an extraction worker process,
+# with (allowPOS, num_wanted, count_tokens)
+_WORKER_EXTRACTOR = None
+_WORKER_PARM = None
+
+
+def _init_extraction_worker(suggestion_word: List[str],
+                            whitelist_word: List[str],
+                            blacklist_word: List[str],
+                            extractor: str,
+                            allowPOS,
+                            num_wanted: int,
+                            count_tokens: bool,
+                            snapshot_folder: Optional[str],
+                            token_cache_folder: Optional[str],
+                            dictionary_key: Optional[str],
+                            idf: Optional[Tuple[Dict[str, float], float]]) \
+        -> None:
+    """初始化抽取进程，每个进程只装载一次词典"""
+    global _WORKER_EXTRACTOR, _WORKER_PARM
+    jieba_instant = build_tokenizer(suggestion_word, whitelist_word,
+                                    blacklist_word,
+                                    snapshot_folder=snapshot_folder)
+    jieba_instant.initialize()
+    _WORKER_EXTRACTOR = build_extractor(extractor, jieba_instant,
+                                        token_cache_folder, dictionary_key,
+                                        idf)
+    _WORKER_PARM = (allowPOS, num_wanted, count_tokens)
+
+
+def _extract_chunk(articles: List[str]) -> \
+        List[Tuple[List[Tuple[str, float]], Optional[Dict[str, int]]]]:
+    """在抽取进程中抽取一组文章的关键词"""
+    allowPOS, num_wanted, count_tokens = _WORKER_PARM
+    return _extract_articles(articles, _WORKER_EXTRACTOR, allowPOS,
+                             num_wanted, count_tokens)
+
+
+def _document_chunk(articles: List[str]) -> List[List[str]]:
+    """在抽取进程中找出一组文章各自包含的词汇"""
+    allowPOS, _, _ = _WORKER_PARM
+    tokenizer = _WORKER_EXTRACTOR.postokenizer if allowPOS else \
+        _WORKER_EXTRACTOR.tokenizer
+    return [document_words(article, tokenizer) for article in articles]
+
+
+def _map_chunks(func, articles: List[Tuple[str, str]], tracker, disc: str,
+                worker: int, initargs: tuple) -> list:
+    """
+    把文章分组发送给抽取进程，按照 articles 的顺序返回 func 对每篇文章的结果
+
+    参数列表如下：
+    :param func: 在抽取进程中处理一组文章的函数
+    :param articles: [(文章标题, 文章), ...]
+    :param disc: 进度描述
+    :param initargs: _init_extraction_worker 的参数
+    """
+    chunk_size = max(1, min(EXTRACTION_CHUNK_SIZE,
+                            len(articles) // (worker * 4)))
+    chunks = [articles[i:i + chunk_size]
+              for i in range(0, len(articles), chunk_size)]
+    results = [None] * len(chunks)
+    tracker.log("   使用 {} 个进程处理 {} 篇文章 [每组 {} 篇]".format(
+        min(worker, len(chunks)), len(articles), chunk_size), prt=True)
+    executor = ProcessPoolExecutor(
+        max_workers=min(worker, len(chunks)),
+        initializer=_init_extraction_worker,
+        initargs=initargs,
+    )
+    futures = {}
+    try:
+        for i, chunk in enumerate(chunks):
+            futures[executor.submit(func, [a for _, a in chunk])] = i
+        for future in as_completed(futures):
+            i = futures[future]
+            results[i] = future.result()
+            tracker.update_disc_fill("{} {}".format(disc, chunks[i][-1][0]))
+            tracker.tick(len(chunks[i]))
+    finally:
+        # shutdown only takes cancel_futures from python 3.9
+        for future in futures:
+            future.cancel()
+        executor.shutdown(wait=True)
+    return [article for result in results for article in result]
+
+
+def _prepare_snapshot(suggestion_word: List[str],
+                      whitelist_word: List[str],
+                      blacklist_word: List[str],
+                      tracker,
+                      snapshot_folder: Optional[str]) -> None:
+    # the workers only read the snapshot, so it is written once here
+    if snapshot_folder is not None:
+        snapshot = TokenizerSnapshot(snapshot_folder, TOKENIZER_SNAPSHOT_KEEP)
+        if not snapshot.exists(snapshot.make_key(
+                suggestion_word, whitelist_word, blacklist_word)):
+            build_tokenizer(suggestion_word, whitelist_word, blacklist_word,
+                            tracker, snapshot_folder)
+
+
+def extract_parallel(articles: List[Tuple[str, str]],
+                     suggestion_word: List[str],
+                     whitelist_word: List[str],
+                     blacklist_word: List[str],
+                     tracker,
+                     allowPOS,
+                     num_wanted: int,
+                     extractor: str,
+                     worker: int,
+                     snapshot_folder: Optional[str] = None,
+                     count_tokens: bool = False,
+                     token_cache_folder: Optional[str] = None,
+                     dictionary_key: Optional[str] = None,
+                     idf: Optional[Tuple[Dict[str, float], float]] = None) \
+        -> List[Tuple[List[Tuple[str, float]], Optional[Dict[str, int]]]]:
+    """
+    使用多个进程抽取关键词，按照 articles 的顺序返回每篇文章的
+    ([(关键词, 权重), ...], 词频表)，count_tokens 为 False 时词频表为 None
+
+    每个进程只装载一次词典，文章分组发送给进程，每组完成时更新进度，
+    提供 snapshot_folder 时先在当前进程中准备好词典快照，所有进程直接读取快照
+
+    参数列表如下：
+    :param articles: [(文章标题, 文章), ...]
+    :param worker: 进程数
+    :param snapshot_folder: 词典快照文件夹
+    :param count_tokens: 是否同时返回每篇文章的词频表
+    :param token_cache_folder: 分词缓存文件夹，与词典快照的键 dictionary_key 一起使用
+    :param idf: 语料库 IDF，为 None 时使用 jieba 自带的 IDF 表
+    """
+    _prepare_snapshot(suggestion_word, whitelist_word, blacklist_word,
+                      tracker, snapshot_folder)
+    return _map_chunks(
+        _extract_chunk, articles, tracker, "抽取", worker,
+        (suggestion_word, whitelist_word, blacklist_word, extractor, allowPOS,
+         num_wanted, count_tokens, snapshot_folder, token_cache_folder,
+         dictionary_key, idf))
+
+
+def document_words(article: str, tokenizer) -> List[str]:
+    """返回一篇文章中 TF-IDF 会计入的词汇，不重复"""
+    words = set()
+    for token in tokenizer.cut(article):
+        word = getattr(token, "word", token)
+        # jieba's tf-idf skips the shorter ones as well
+        if len(word.strip()) >= 2:
+            words.add(word)
+    return list(words)
+
+
+def _cut_key(dictionary_key: str, allowPOS) -> str:
+    # tf-idf cuts with pos only when allowPOS is given
+    return "{}:{}".format(dictionary_key, "pos" if allowPOS else "plain")
+
+
+def corpus_key(data: Dict[str, Dict[str, str]],
+               suggestion_word: List[str],
+               whitelist_word: List[str],
+               blacklist_word: List[str],
+               allowPOS) -> str:
+    """语料库 IDF 的指纹，文章或者分词方式改变时改变"""
+    dictionary_key = TokenizerSnapshot.make_key(
+        suggestion_word, whitelist_word, blacklist_word)
+    return corpus_fingerprint(
+        (article_digest(a) for articles in data.values()
+         for a in articles.values()),
+        _cut_key(dictionary_key, allowPOS))
+
+
+def corpus_idf(data: Dict[str, Dict[str, str]],
+               suggestion_word: List[str],
+               whitelist_word: List[str],
+               blacklist_word: List[str],
+               tracker,
+               allowPOS,
+               worker: int = EXTRACTION_WORKER,
+               snapshot_folder: Optional[str] = None,
+               token_cache_folder: Optional[str] = None,
+               idf_path: Optional[str] = None) -> \
+        Tuple[Tuple[Dict[str, float], float], str]:
+    """
+    根据 data 中的所有文章计算语料库 IDF，返回 ((IDF 表, IDF 中位数), 语料库指纹)
+
+    每篇文章只分词一次，由 worker 个进程同时统计；提供 idf_path 时读取上次保存的
+    文档频率，只需要统计新增的文章，并移除已经不在 data 中的文章
+    """
+    dictionary_key = TokenizerSnapshot.make_key(
+        suggestion_word, whitelist_word, blacklist_word)
+    store = IdfStore(idf_path, _cut_key(dictionary_key, allowPOS))
+    articles = {
+        article_digest(article): (name, article)
+        for names in data.values() for name, article in names.items()
+    }
+    removed = store.retain(articles)
+    pending = store.missing(articles)
+    tracker.log("   正在统计语料库文档频率 [已记录 {} 篇, 新增 {} 篇, 移除 {} 篇]"
+                .format(len(articles) - len(pending), len(pending), removed),
+                prt=True)
+    if len(pending) != 0:
+        tracker.init_ticker("    进程", "正在统计文档频率", 0, len(pending))
+        if worker > 1 and len(pending) > 1:
+            _prepare_snapshot(suggestion_word, whitelist_word,
+                              blacklist_word, tracker, snapshot_folder)
+            results = _map_chunks(
+                _document_chunk, [articles[d] for d in pending], tracker,
+                "统计", worker,
+                (suggestion_word, whitelist_word, blacklist_word,
+                 TF_IDF_CORPUS, allowPOS, None, False, snapshot_folder,
+                 token_cache_folder, dictionary_key, None))
+        else:
+            jieba_instant = build_tokenizer(suggestion_word, whitelist_word,
+                                            blacklist_word, tracker,
+                                            snapshot_folder)
+            word_extractor = build_extractor(TF_IDF_CORPUS, jieba_instant,
+                                             token_cache_folder,
+                                             dictionary_key)
+            tokenizer = word_extractor.postokenizer if allowPOS else \
+                word_extractor.tokenizer
+            results = []
+            for d in pending:
+                name, article = articles[d]
+                tracker.update_disc_fill("统计 {}".format(name))
+                results.append(document_words(article, tokenizer))
+                tracker.tick()
+        for d, words in zip(pending, results):
+            store.add(d, words)
+    store.save()
+    return store.idf(), store.fingerprint()
+
+
+def article_keys(data: Dict[str, Dict[str, str]],
+                 suggestion_word: List[str],
+                 whitelist_word: List[str],
+                 blacklist_word: List[str],
+                 allowPOS,
+                 num_wanted: int,
+                 extractor: str,
+                 corpus: Optional[str] = None) -> Dict[str, Dict[str, str]]:
+    """
+    计算每篇文章抽取结果的指纹，格式为 { category: { name: fingerprint } }
+
+    词典的改动只会影响包含该词汇的文章，所以指纹只包括文章中出现的
+    建议/白名单/黑名单 词汇，只改动黑名单时只有包含改动词汇的文章需要重新抽取
+    （装载词汇对词典总词频的影响忽略不计）；
+    使用语料库 IDF 时 IDF 与所有文章有关，corpus 为语料库的指纹
+    """
+    if num_wanted is not None and num_wanted <= 0:
+        num_wanted = None
+    blacklist = set(blacklist_word)
+    added = [w for w in dict.fromkeys(suggestion_word + whitelist_word)
+             if w not in blacklist]
+    words = added + sorted(blacklist)
+    counter = TagCounter(words) if len(words) != 0 else None
+    keys = {}
+    for category, articles in data.items():
+        keys[category] = {}
+        for name, article in articles.items():
+            relevant = [] if counter is None else [
+                w for w, count in zip(words, counter.count_list(article, True))
+                if count > 0
+            ]
+            values = (
+                article, extractor, sorted(allowPOS), num_wanted,
+                sorted(w for w in relevant if w not in blacklist),
+                sorted(w for w in relevant if w in blacklist),
+            )
+            if corpus is not None:
+                values += (corpus,)
+            keys[category][name] = fingerprint(*values)
+    return keys
+
+
+def restore_summary(data: Dict[str, Dict[str, str]],
+                    suggestion_word: List[str],
+                    whitelist_word: List[str],
+                    blacklist_word: List[str],
+                    allowPOS,
+                    num_wanted: int,
+                    extractor: str,
+                    store: ArtifactStore,
+                    count_tokens: bool = False,
+                    idf_path: Optional[str] = None) -> \
+        Optional[Tuple[Dict[str, Dict[str, Dict[str, float]]],
+                       Optional[Dict[str, Dict[str, Dict[str, int]]]]]]:
+    """
+    所有文章都有上次的抽取结果时返回与 summarise 相同的 (关键词汇, 词频表)，
+    否则返回 None，count_tokens 为 True 时还需要每篇文章都有上次的词频表；
+    使用语料库 IDF 时还需要 idf_path 中保存的文档频率包括所有文章
+    """
+    saved = store.load(ARTIFACT_EXTRACTION)
+    if saved is None:
+        return None
+    saved_counts = store.load(ARTIFACT_TOKEN_COUNTS) if count_tokens else {}
+    if saved_counts is None:
+        return None
+    corpus = None
+    if extractor == TF_IDF_CORPUS:
+        if idf_path is None:
+            return None
+        corpus = corpus_key(data, suggestion_word, whitelist_word,
+                            blacklist_word, allowPOS)
+    keys = article_keys(data, suggestion_word, whitelist_word,
+                        blacklist_word, allowPOS, num_wanted, extractor,
+                        corpus)
+    if any(key not in saved or (count_tokens and key not in saved_counts)
+           for names in keys.values() for key in names.values()):
+        return None
     tags = {
-        category: {name: extract(
-            name,
-            article,
-            whitelist_word,
-            blacklist_word,
-            word_extractor,
-            tracker,
-            allowPOS,
-            num_wanted) for name, article in articles.items()}
-        for category, articles in data.items()
+        category: {
+            name: filter_tags(saved[key], whitelist_word, blacklist_word)
+            for name, key in names.items()
+        }
+        for category, names in keys.items()
     }
-    return tags
+    if not count_tokens:
+        return tags, None
+    return tags, vocabulary_counts(tags, {
+        (category, name): saved_counts[key]
+        for category, names in keys.items() for name, key in names.items()
+    })
+
+
+def vocabulary_counts(tags: Dict[str, Dict[str, Dict[str, float]]],
+                      counts: Dict[Tuple[str, str], Dict[str, int]]) -> \
+        Dict[str, Dict[str, Dict[str, int]]]:
+    """
+    只保留抽取结果中出现过的词汇的词频
+
+    参数列表如下：
+    :param tags: { category: { name: { 关键词: 权重 } } }
+    :param counts: { (category, name): { 词汇: 次数 } }
+
+    返回参数如下：
+    :return: { category: { name: { 关键词: 次数 } } }
+    """
+    vocabulary = {
+        tag for articles in tags.values() for article in articles.values()
+        for tag in article
+    }
+    return {
+        category: {
+            name: {
+                token: count
+                for token, count in counts[(category, name)].items()
+                if token in vocabulary
+            }
+            for name in articles
+        }
+        for category, articles in tags.items()
+    }
+
+
+def summarise(data: Dict[str, Dict[str, str]],
+              suggestion_word: List[str],
+              whitelist_word: List[str],
+              blacklist_word: List[str],
+              tracker,
+              allowPOS,
+              num_wanted: int,
+              extractor,
+              store: Optional[ArtifactStore] = None,
+              worker: int = EXTRACTION_WORKER,
+              snapshot_folder: Optional[str] = None,
+              count_tokens: bool = False,
+              token_cache_folder: Optional[str] = None,
+              idf_path: Optional[str] = None) -> \
+        Tuple[Dict[str, Dict[str, Dict[str, float]]],
+              Optional[Dict[str, Dict[str, Dict[str, int]]]]]:
+    """
+    总结所有的关键词汇，返回 (关键词汇, 词频表)
+
+    关键词汇的格式为 { category: { name: { 关键词: 权重 } } }；
+    count_tokens 为 True 时，抽取关键词的同时记录分词的结果，
+    词频表的格式为 { category: { name: { 关键词: 次数 } } }，只包括关键词汇中
+    出现过的词汇，统计分析可以直接使用，否则词频表为 None
+
+    参数列表如下：
+    :param data: 数据
+    :param suggestion_word: 建议关键词列表
+    :param whitelist_word: 想要一定出现的关键词列表
+    :param blacklist_word: 想要一定不出现的关键词列表
+    :param tracker: 追踪器
+    :param num_wanted: 想要的关键词的个数
+    :param extractor: 用做提取器的算法，应该为 EXTRACTOR 中的键
+    :param allowPOS: 词性
+    :param store: 步骤结果储存，提供时只重新抽取指纹改变了的文章
+    :param worker: 抽取进程数，为 1 时在当前进程中抽取
+    :param snapshot_folder: jieba 词典快照文件夹，为 None 时每次重新装载词汇
+    :param count_tokens: 是否记录每篇文章的词频表
+    :param token_cache_folder: 分词缓存文件夹，只改变提取器、词性或者抽取数目时
+                               不需要重新分词，为 None 时每次重新分词
+    :param idf_path: 语料库文档频率文件，使用 TF_IDF_CORPUS 时只需要统计新增的文章，
+                     为 None 时每次重新统计
+    """
+    # init the tracker
+    # the total progress contains:
+    #       each article in each year
+    total_article_count = sum(
+        1 for cat in data.values() for _ in cat
+    )
+    idf, corpus = None, None
+    if extractor == TF_IDF_CORPUS:
+        # every article's weights depend on the whole corpus
+        idf, corpus = corpus_idf(data, suggestion_word, whitelist_word,
+                                 blacklist_word, tracker, allowPOS, worker,
+                                 snapshot_folder, token_cache_folder,
+                                 idf_path)
+    keys = None
+    raw_tags = {}
+    raw_counts = {}
+    if store is not None:
+        keys = article_keys(data, suggestion_word, whitelist_word,
+                            blacklist_word, allowPOS, num_wanted, extractor,
+                            corpus)
+        saved = store.load(ARTIFACT_EXTRACTION) or {}
+        raw_tags = {
+            key: saved[key] for names in keys.values()
+            for key in names.values() if key in saved
+        }
+        if count_tokens:
+            saved = store.load(ARTIFACT_TOKEN_COUNTS) or {}
+            raw_counts = {
+                key: saved[key] for names in keys.values()
+                for key in names.values() if key in saved
+            }
+
+    def is_saved(category, name):
+        if keys is None:
+            return False
+        key = keys[category][name]
+        return key in raw_tags and (not count_tokens or key in raw_counts)
+
+    # articles without a saved result
+    pending = [
+        (category, name) for category, articles in data.items()
+        for name in articles if not is_saved(category, name)
+    ]
+    if store is not None:
+        tracker.log("   {} 篇文章没有变化, 使用上次的抽取结果".format(
+            total_article_count - len(pending)), prt=True)
+    parallel = worker > 1 and len(pending) > 1
+    dictionary_key = None
+    if token_cache_folder is not None and \
+            (len(pending) != 0 or idf is not None):
+        dictionary_key = TokenizerSnapshot.make_key(
+            suggestion_word, whitelist_word, blacklist_word)
+    word_extractor = None
+    if len(pending) != 0 and not parallel:
+        jieba_instant = build_tokenizer(suggestion_word, whitelist_word,
+                                        blacklist_word, tracker,
+                                        snapshot_folder)
+        word_extractor = build_extractor(extractor, jieba_instant,
+                                         token_cache_folder, dictionary_key,
+                                         idf)
+    tracker.log("   正在抽取关键词汇", prt=True)
+    tracker.init_ticker("    进程", "正在抽取词汇", 0, total_article_count)
+    tracker.tick(total_article_count - len(pending))
+    # extract the important word segment
+    extracted = {}
+    if parallel:
+        results = extract_parallel(
+            [(name, data[category][name]) for category, name in pending],
+            suggestion_word, whitelist_word, blacklist_word, tracker,
+            allowPOS, num_wanted, extractor, worker, snapshot_folder,
+            count_tokens, token_cache_folder, dictionary_key, idf)
+        extracted = dict(zip(pending, results))
+    else:
+        # an extractor with extract_corpus scores a batch at once
+        step = CORPUS_BATCH_SIZE \
+            if hasattr(word_extractor, "extract_corpus") else 1
+        for i in range(0, len(pending), step):
+            batch = pending[i:i + step]
+            tracker.update_disc_fill("抽取 {}".format(batch[-1][1]))
+            extracted.update(zip(batch, _extract_articles(
+                [data[category][name] for category, name in batch],
+                word_extractor, allowPOS, num_wanted, count_tokens)))
+            tracker.tick(len(batch))
+    # merge the extracted and the saved tags
+    tags = {}
+    counts = {}
+    for category, articles in data.items():
+        tags[category] = {}
+        for name in articles:
+            key = None if keys is None else keys[category][name]
+            if (category, name) in extracted:
+                article_tags, article_counts = extracted[(category, name)]
+                if key is not None:
+                    raw_tags[key] = article_tags
+                    if count_tokens:
+                        raw_counts[key] = article_counts
+            else:
+                article_tags = raw_tags[key]
+                article_counts = raw_counts.get(key)
+            tags[category][name] = filter_tags(article_tags, whitelist_word,
+                                               blacklist_word)
+            counts[(category, name)] = article_counts
+    if store is not None:
+        store.save(ARTIFACT_EXTRACTION, raw_tags)
+        if count_tokens:
+            store.save(ARTIFACT_TOKEN_COUNTS, raw_counts)
+    if dictionary_key is not None:
+        removed = TokenCache(token_cache_folder).trim(TOKEN_CACHE_SIZE_LIMIT)
+        if removed != 0:
+            tracker.log("   已淘汰 {} 篇文章的分词缓存".format(removed), prt=True)
+    if not count_tokens:
+        return tags, None
+    return tags, vocabulary_counts(tags, counts)
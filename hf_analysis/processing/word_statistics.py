@@ -5,18 +5,22 @@
 """
 from __future__ import annotations
 
-from typing import Dict, FrozenSet, Optional, Tuple
+from typing import TYPE_CHECKING, Dict, FrozenSet, List, Optional, Tuple
 
-import numpy as np
-from sklearn import metrics
-from sklearn.linear_model import LinearRegression
-from sklearn.model_selection import train_test_split
+from hf_analysis.processing.artifact import ArtifactStore, fingerprint
+from hf_analysis.processing.count_matrix import CountMatrix
+from hf_analysis.processing.tag_counter import TagCounter
+
+if TYPE_CHECKING:
+    # numpy is imported when the analysis runs
+    import numpy as np
 
 # the trend flags
 TREND_FLAG_STABLE = "stable"
 TREND_FLAG_DECLINE = "decline"
 TREND_FLAG_INCREASE = "increase"
 
+
 class StatisticalAnalyzer:
     """
     通过统计分析来总结此数据里的重要词汇
@@ -90,31 +94,53 @@ class TrendAnalyzer(StatisticalAnalyzer):
             新生型高频词汇
                 - TREND_FLAG_INCREASE
                 - 定义：词汇的出现频率几乎一直在递增
+
+        词汇出现次数由 TagCounter 扫描每篇文章一次得出,
+        overlapping 为 False（默认）时与 str.count 的结果相同；
+        提供 token_counts（summarise 的词频表）时直接使用抽取词汇时的分词结果，
+        不再扫描文章，"中国" 不会被计入 "中国人",
+        细节结果为 CountMatrix，可以当作 { 类别: { 词汇: { 文章: 次数 } } } 读取
         """
+        import numpy as np
         tracker = kwargs["tracker"]
+        overlapping = kwargs.get("overlapping", False)
+        token_counts = kwargs.get("token_counts")
         tags = self.all_tags()
         tracker.init_ticker("   进程", "正在进行趋势分析", 0,
                             len(tags) + len(self._articles))
-        # detail summary
-        detail_summary = {}
-        for category, articles in self._articles.items():
+        counter = None
+        if token_counts is None:
+            # build the automaton once for all articles
+            counter = TagCounter(tags)
+            tag_list = counter.tags
+        else:
+            tag_list = list(tags)
+        # detail summary, one column per article in category order
+        categories = sorted(self._articles, key=lambda c: self._sorting[c])
+        detail_summary = CountMatrix(tag_list, {
+            category: list(self._articles[category])
+            for category in categories
+        })
+        for category in categories:
             tracker.update_disc_fill("分析类别 {}".format(category))
-            detail_summary[category] = {
-                tag: {name: article.count(tag) for name, article in
-                      articles.items()}
-                for tag in tags
-            }
+            for name, article in self._articles[category].items():
+                if counter is None:
+                    detail_summary.set_count_map(
+                        category, name, token_counts[category][name])
+                else:
+                    detail_summary.set_counts(
+                        category, name,
+                        counter.count_list(article, overlapping))
             tracker.tick()
-        # total summary
+        # total summary, summed per category in one reduction
+        occurrences = detail_summary.totals()
+        # fit all tags at once
+        regressions = self.linear_regression_batch(
+            occurrences.astype(np.float64))
         total_summary = {}
-        for tag in tags:
+        for tag, values, lr in zip(tag_list, occurrences.tolist(),
+                                   regressions):
             tracker.update_disc_fill("分析词汇 {}".format(tag))
-            values = list(occ for _, occ in sorted(
-                {category: sum(tags_detail[tag].values())
-                 for category, tags_detail in detail_summary.items()}.items(),
-                key=lambda i: self._sorting[i[0]]
-            ))
-            lr = self.linear_regression(values)
             label = self.label(lr)
             total_summary[tag] = {
                 "occurrence": values,
@@ -125,19 +151,45 @@ class TrendAnalyzer(StatisticalAnalyzer):
         return total_summary, detail_summary
 
     @staticmethod
-    def linear_regression(values) -> Optional[Tuple[float, float, float]]:
-        if len(values) < 2:
-            return None
-        # build the module
-        x = np.array(range(len(values))).reshape(-1, 1)
-        y = np.array(values).reshape(-1, 1)
-        reg = LinearRegression()
-        reg.fit(x, y)
-        coefficient = reg.coef_
-        intercept = reg.intercept_
-        # calculate R_2
-        R_2 = reg.score(x, y)
-        return coefficient, intercept, R_2
+    def linear_regression_batch(matrix: np.ndarray) -> \
+            List[Optional[Tuple[float, float, float]]]:
+        """
+        对矩阵的每一行同时进行一元最小二乘线性拟合
+
+        参数列表如下：
+        :param matrix: 词汇 x 类别 的矩阵，每一行为一个词汇按类别排序的出现次数
+
+        返回参数如下：
+        :return: 每一行的 (coefficient, intercept, R_2)，类别少于两个时为 None
+        """
+        import numpy as np
+        y = np.asarray(matrix, dtype=np.float64)
+        num_rows, num_values = y.shape
+        if num_values < 2:
+            return [None] * num_rows
+        x = np.arange(num_values, dtype=np.float64)
+        x_centered = x - x.mean()
+        y_mean = y.mean(axis=1)
+        # since x_centered sums to zero, sum(x_c * (y - y_mean)) == y @ x_c
+        coefficient = (y @ x_centered) / (x_centered @ x_centered)
+        intercept = y_mean - coefficient * x.mean()
+        # calculate R_2, a constant row is fitted perfectly
+        residual = y - (intercept[:, None] + coefficient[:, None] * x)
+        ss_res = np.einsum("ij,ij->i", residual, residual)
+        deviation = y - y_mean[:, None]
+        ss_tot = np.einsum("ij,ij->i", deviation, deviation)
+        R_2 = np.ones(num_rows)
+        varying = ss_tot > 0
+        R_2[varying] = 1 - ss_res[varying] / ss_tot[varying]
+        return list(zip(coefficient.tolist(), intercept.tolist(),
+                        R_2.tolist()))
+
+    @classmethod
+    def linear_regression(cls, values) -> \
+            Optional[Tuple[float, float, float]]:
+        import numpy as np
+        return cls.linear_regression_batch(
+            np.array(values, dtype=np.float64).reshape(1, -1))[0]
 
     def label(self, lr) -> Optional[str]:
         """给此预测标签"""
@@ -152,13 +204,40 @@ class TrendAnalyzer(StatisticalAnalyzer):
             return TREND_FLAG_STABLE
 
 
+def analysis_fingerprint(segment, articles, sorting, statistics_analyzer,
+                         **kwargs) -> str:
+    """统计分析的输入指纹"""
+    return fingerprint(statistics_analyzer, segment, articles, sorting,
+                       sorted(kwargs.items()))
+
+
+def restore_analysis(segment,
+                     articles,
+                     sorting,
+                     statistics_analyzer,
+                     store: ArtifactStore,
+                     **kwargs) -> Optional[Tuple[Dict, Dict]]:
+    """输入没有变化时返回上次的分析结果，否则返回 None"""
+    from hf_analysis.parameter import ARTIFACT_ANALYZE
+    return store.load(ARTIFACT_ANALYZE, analysis_fingerprint(
+        segment, articles, sorting, statistics_analyzer, **kwargs))
+
+
 def analyze(segment,
             articles,
             sorting,
             tracker,
-            statistics_analyzer=TrendAnalyzer, **kwargs):
-    from hf_analysis.parameter import ANALYZER
+            statistics_analyzer=TrendAnalyzer,
+            store: Optional[ArtifactStore] = None, **kwargs):
+    from hf_analysis.parameter import ANALYZER, ARTIFACT_ANALYZE
     tracker.log("正在分析数据统计", prt=True)
+    if store is not None:
+        stage_fingerprint = analysis_fingerprint(
+            segment, articles, sorting, statistics_analyzer, **kwargs)
+        restored = store.load(ARTIFACT_ANALYZE, stage_fingerprint)
+        if restored is not None:
+            tracker.log("数据没有变化, 使用上次的分析结果", prt=True)
+            return restored
     # create the statistical analyzer
     analyzer = ANALYZER[statistics_analyzer].const(
         tags=segment,
@@ -168,4 +247,6 @@ def analyze(segment,
     # analyze the data
     kwargs["tracker"] = tracker
     result = analyzer.analyze(**kwargs)
+    if store is not None:
+        store.save(ARTIFACT_ANALYZE, result, stage_fingerprint)
     return result
@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import time
+from datetime import datetime
+
+from hf_analysis.parameter import *
+
+
+class ProgressTracker:
+    def __init__(self,
+                 enable_print_out: bool = True,
+                 update_func=None) -> None:
+        self._enable_print_out = enable_print_out
+        self._update_func = update_func
+        # message
+        # if not exists(LOG_PATH):
+        #     makedirs(LOG_PATH)
+        # time_stamp = self._time_stamp()
+        # name = "{}_{}.log".format(time_stamp.date(), time_stamp.time())
+        # logging.basicConfig(
+        #     filename=join(LOG_PATH, name),
+        #     filemode="w+",
+        #     style="{",
+        #     format="{threadName:<20s} <{levelname:<7s}> "
+        #            "[{asctime:<15s}] {message}",
+        #     level=logging.DEBUG
+        # )
+        self._logger = logging.getLogger("Main Logger")
+        self._logger.setLevel(logging.DEBUG)
+        # tick
+        self._process_name = None
+        self._process_disc = None
+        self._process_disc_fill = None
+        self._init_tick = None
+        self._total_tick = None
+        self._current_tick = None
+        self._start_time = None
+        self._end_time = None
+        self._down_time_start = 0
+        self._down_time_accum = 0
+        self._time_accum = 0
+
+    def init_ticker(self, process_name, process_disc, init_tick, total_tick):
+        if self._current_tick is None or self._current_tick == self._total_tick:
+            self._process_name = process_name
+            self._process_disc = process_disc
+            self._process_disc_fill = None
+            self._init_tick = init_tick
+            self._total_tick = total_tick
+            self._current_tick = init_tick
+            self._start_time = time.time()
+            self._end_time = None
+            self._update(mode=TRACKER_TICK_INIT,
+                         process_name=self._process_name,
+                         process_disc=self._process_disc,
+                         total_tick=self._total_tick,
+                         init_tick=self._init_tick,
+                         start=True)
+            return True
+        return False
+
+    def update_disc_fill(self, fill):
+        self._process_disc_fill = fill
+        time_remain = self.predict_time_remaining()
+        self._update(mode=TRACKER_TICK_DESC_UPDATE,
+                     process_disc=self._process_disc,
+                     process_disc_fill=fill,
+                     total_tick=self._total_tick,
+                     current_tick=self._current_tick,
+                     time_remain=time_remain)
+
+    def reset_ticker(self):
+        self._down_time_start = 0
+        self._down_time_accum = 0
+        self._process_name = None
+        self._process_disc = None
+        self._process_disc_fill = None
+        self._init_tick = None
+        self._total_tick = None
+        self._current_tick = None
+        self._start_time = None
+        self._end_time = None
+
+    def set_indeterminate(self, indeterminate):
+        if indeterminate:
+            # the down time has started
+            self._down_time_start = time.time()
+        else:
+            self._down_time_accum = time.time() - self._down_time_start
+        self._update(
+            mode=TRACKER_SET_INDETERMINATE,
+            indeterminate=indeterminate,
+            process_disc=self._process_disc,
+            process_disc_fill=self._process_disc_fill,
+        )
+
+    def clear_time_accum(self):
+        self._time_accum = 0
+
+    def tick(self, amount: int = 1) -> None:
+        if amount <= 0:
+            return
+        prev = self._current_tick
+        pending_amount = prev + amount
+        if pending_amount < self._total_tick:
+            self._current_tick = pending_amount
+            end = False
+        else:
+            self._current_tick = self._total_tick
+            end = True
+        if end:
+            self._end_time = time.time()
+        time_remain = self.predict_time_remaining()
+        self._update(mode=TRACKER_TICK,
+                     time_remain=time_remain,
+                     process_disc=self._process_disc,
+                     total_tick=self._total_tick,
+                     current_tick=self._current_tick,
+                     amount=self._current_tick - prev,
+                     disc_fill=self._process_disc_fill,
+                     end=end)
+
+    def log(self, message: str, tp=TRACKER_LOG_INFO,
+            exc_info=None,
+            stack_info=False,
+            stacklevel=1,
+            extra=None,
+            prt=False) -> None:
+        if prt:
+            print(message)
+        message = message.strip()
+        self._logger.log(
+            level=tp,
+            msg=message,
+            exc_info=exc_info,
+            stack_info=stack_info,
+            stacklevel=stacklevel,
+            extra=extra
+        )
+        # self._message.append((self._time_stamp(), tp, message))
+        self._update(mode=TRACKER_LOG, tp=tp, prt=prt, message=message)
+
+    def time_elapsed(self, use_time_accum=False) -> str:
+        if not use_time_accum:
+            if self._start_time is None or self._end_time is None:
+                return ""
+            time_elapsed = self._end_time - self._start_time
+        else:
+            time_elapsed = self._time_accum
+        return self._format_time(time_elapsed)
+
+    @staticmethod
+    def _time_stamp():
+        return datetime.fromtimestamp(time.time())
+
+    @staticmethod
+    def _format_time(time_):
+        hours, rem = divmod(time_, 3600)
+        minutes, second = divmod(rem, 60)
+        return "{:0>2}:{:0>2}:{:0>2}".format(int(hours), int(minutes),
+                                             int(second))
+
+    def predict_time_remaining(self):
+        if self._start_time is None:
+            return ""
+        time_elapsed = time.time() - self._start_time - self._down_time_accum
+        tick_passed = self._current_tick - self._init_tick
+        if tick_passed == 0:
+            return "未知"
+        average_time_use_per_tick = time_elapsed / tick_passed
+        time_remaining = average_time_use_per_tick * (
+                self._total_tick - self._current_tick)
+        return self._format_time(round(time_remaining))
+
+    def _update(self, **kwargs):
+        if kwargs["mode"] == TRACKER_TICK:
+            amount = kwargs["amount"]
+            end = kwargs["end"]
+            if self._enable_print_out:
+                # if this is the first time printing, we also print the header
+                print("=" * amount, end="")
+                if end:
+                    time_elapsed = self.time_elapsed()
+                    print("| Time Elapsed : {}".format(time_elapsed))
+                    # also log itself
+                    self.log(
+                        "{} 结束！ 用时 : {} [desc={}, init={}, total={}]".format(
+                            self._process_name,
+                            time_elapsed,
+                            self._process_disc,
+                            self._init_tick,
+                            self._total_tick,
+                        ))
+                    self._time_accum += self._end_time - self._start_time
+        elif kwargs["mode"] == TRACKER_TICK_INIT:
+            start = kwargs["start"]
+            if start:
+                print("{0:s} {1:>5d}|".format(self._process_name,
+                                              self._total_tick), end="")
+        if self._update_func is not None:
+            self._update_func(**kwargs)
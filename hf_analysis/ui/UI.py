@@ -64,6 +64,8 @@ class InfoFrame(tk.Frame):
         # try to load from JSON
         self._info_handler.load_from_json(tracker=self.tracker)
         self._info_handler.sync_all()
+        # try to restore the results of the last session
+        self.central_frame.restore_artifacts()
 
     def add_items(self):
         divided = self.size_conf.divide((
@@ -101,6 +103,7 @@ class InfoFrame(tk.Frame):
                 INFO_ARTICLES,
                 INFO_SORTING,
                 INFO_TAGS,
+                INFO_TOKEN_COUNTS,
                 INFO_ANALYZED_SUMMARY,
                 INFO_ANALYZED_DETAIL,
                 INFO_PATCH,
@@ -227,6 +230,9 @@ class CentralFrame(BaseFrame):
     def progress_update(self, *args, **kwargs):
         self.progress_field.progress_update(*args, **kwargs)
 
+    def restore_artifacts(self):
+        self.action_field.restore_artifacts()
+
 
 class RightPramFrame(BaseFrame):
     """
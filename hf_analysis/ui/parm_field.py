@@ -562,6 +562,11 @@ class CentralActionFrame(BaseFrame):
             not_none=True,
             key=INFO_TAGS,
         )
+        self._info_handler.register_field(
+            source=None,
+            default=None,
+            key=INFO_TOKEN_COUNTS,
+        )
         self._info_handler.register_field(
             source=None,
             default=None,
@@ -656,6 +661,50 @@ class CentralActionFrame(BaseFrame):
             self._info_handler.put_field(
                 key=key, value=None
             )
+            if key == INFO_TAGS:
+                # the token counts come with the tags
+                self._info_handler.put_field(
+                    key=INFO_TOKEN_COUNTS, value=None
+                )
+
+    def restore_artifacts(self, start=INFO_ARTICLES, then=None):
+        """
+        从根目录的 artifact 文件夹恢复 start 及之后步骤的结果,
+        输入没有变化的步骤不需要重新运行
+
+        恢复需要读取所有的数据, 在后台线程中进行, 期间所有按钮不可用,
+        结束之后在主线程中调用 then, then 为 None 时同步按钮
+        """
+        for b in self._buttons:
+            b.config(state=tk.DISABLED)
+        thread = RestoreThread(self.tracker, self._info_handler, start)
+        thread.start()
+        self.master.after(100, self._check_restore, thread, then)
+
+    def _check_restore(self, thread, then):
+        if not thread.is_finished():
+            self.master.after(100, self._check_restore, thread, then)
+            return
+        thread.join()
+        for key, value in thread.get_return_value():
+            self._info_handler.put_field(key=key, value=value)
+        if then is None:
+            self._sync_button()
+        else:
+            then()
+
+    def _run_next(self, start):
+        """自动开始 start 及之后第一个还没有结果的步骤"""
+        threads = {
+            INFO_ARTICLES: self._load_data_thread,
+            INFO_TAGS: self._extraction_thread,
+            INFO_ANALYZED_SUMMARY: self._analyze_thread,
+        }
+        for key in self.ordered[self.ordered.index(start):]:
+            if not self._info_handler.is_available(key):
+                self.master.after(1000, threads[key].run, False)
+                return
+        self._sync_button()
 
     def _sync_button(self, doing=None):
         """
@@ -828,15 +877,14 @@ class CentralActionFrame(BaseFrame):
             self._info_handler.put_field(
                 key=INFO_SORTING, value=sorting
             )
-            # devalidate the data
+            # devalidate the data, and restore what did not change
             self.devalidate(INFO_TAGS)
+            self.load_data_button.flip()
             if self._info_handler.get(INFO_ACTION_AUTO_NEXT_STEP):
-                # don't sync but flip
-                self.load_data_button.flip()
-                self.master.after(1000, self._extraction_thread.run, False)
+                self.restore_artifacts(
+                    INFO_TAGS, then=lambda: self._run_next(INFO_TAGS))
             else:
-                self._sync_button()
-                self.load_data_button.flip()
+                self.restore_artifacts(INFO_TAGS)
         else:
             self._sync_button()
             self.load_data_button.flip()
@@ -848,18 +896,23 @@ class CentralActionFrame(BaseFrame):
 
     def _ending_extraction(self):
         if self._extraction_thread.get_thread().is_successful():
-            segments = self._extraction_thread.get_thread().get_return_value()
+            segments, token_counts = self._extraction_thread.get_thread() \
+                .get_return_value()
             self._info_handler.put_field(
                 key=INFO_TAGS, value=segments
             )
-            # devalidate the data
+            self._info_handler.put_field(
+                key=INFO_TOKEN_COUNTS, value=token_counts
+            )
+            # devalidate the data, and restore what did not change
             self.devalidate(INFO_ANALYZED_SUMMARY)
+            self.extraction_button.flip()
             if self._info_handler.get(INFO_ACTION_AUTO_NEXT_STEP):
-                self.extraction_button.flip()
-                self.master.after(1000, self._analyze_thread.run, False)
+                self.restore_artifacts(
+                    INFO_ANALYZED_SUMMARY,
+                    then=lambda: self._run_next(INFO_ANALYZED_SUMMARY))
             else:
-                self._sync_button()
-                self.extraction_button.flip()
+                self.restore_artifacts(INFO_ANALYZED_SUMMARY)
         else:
             self._sync_button()
             self.extraction_button.flip()
@@ -948,6 +1001,8 @@ class RightJiebaOpFrame(LabeledBaseFrame):
             master=self, label_text="选择 高频词汇抽取器",
             options=[
                 ("TF-IDF", TF_IDF),
+                ("TF-IDF (语料库)", TF_IDF_CORPUS),
+                ("TF-IDF (批量)", TF_IDF_SPARSE),
                 ("TextRank", TEXT_RANK),
             ],
             var=tk.StringVar,
@@ -1037,15 +1092,17 @@ class RightWordEditFrame(LabeledBaseFrame):
 
 class RightStatAnalyzerFrame(LabeledBaseFrame):
     """
-    [ RadioButtonPart ] 1
+    [ RadioButtonPart ] [ RadioButtonPart ] 1
     ===========
     Stat Analyzer Field:
         Stats Analyzer          Selection               RadioButtonPart
+        Count Mode              Selection               RadioButtonPart
     """
 
     def __init__(self, master, size_conf, info_handler):
         super().__init__(master, "统计分析器", size_conf, info_handler)
         self.select_stat_analyze = None
+        self.select_count_mode = None
         self.add_items()
         self.place_items()
         self._info_handler.register_field(
@@ -1054,10 +1111,16 @@ class RightStatAnalyzerFrame(LabeledBaseFrame):
             key=INFO_ANALYZE_STAT_ANALYZER,
             not_none=True
         )
+        self._info_handler.register_field(
+            source=self.select_count_mode,
+            default=COUNT_MODE_SUBSTRING,
+            key=INFO_ANALYZE_COUNT_MODE,
+            not_none=True
+        )
 
     def add_items(self, *args, **kwargs):
         divided = self.size_conf.divide((
-            (1, 1),
+            (1, 1, 1),
         ), spacing=DEFAULT_SPACING, internal=True, height_offset=21,
             width_offset=4)
         self.select_stat_analyze = RadioButtonsPair(
@@ -1068,8 +1131,17 @@ class RightStatAnalyzerFrame(LabeledBaseFrame):
             var=tk.StringVar,
             size_conf=divided[0][0]
         )
+        self.select_count_mode = RadioButtonsPair(
+            master=self, label_text="选择 词汇计数方式",
+            options=[
+                ("按字符串", COUNT_MODE_SUBSTRING),
+                ("按分词", COUNT_MODE_TOKEN),
+            ],
+            var=tk.StringVar,
+            size_conf=divided[0][1]
+        )
 
     def place_items(self):
         self.size_conf.place([
-            [self.select_stat_analyze],
+            [self.select_stat_analyze, self.select_count_mode],
         ])
@@ -2,14 +2,11 @@
 from __future__ import annotations
 
 import json
-import logging
 import threading
-import time
 import tkinter as tk
 import tkinter.filedialog as filedialog
 import tkinter.messagebox as messagebox
 import tkinter.simpledialog as simpledialog
-from datetime import datetime
 from os import environ, makedirs
 from os.path import abspath, basename, exists, expanduser, isdir, join, split
 from typing import List, Tuple
@@ -18,7 +15,9 @@ from hf_analysis.parameter import *
 from hf_analysis.processing import load_data, output
 from hf_analysis.processing import preprocess
 from hf_analysis.processing import word_extraction, word_statistics
+from hf_analysis.processing.artifact import ArtifactStore
 from hf_analysis.processing.load_data import load_words
+from hf_analysis.tracker import ProgressTracker
 
 
 def get_home_directory():
@@ -849,201 +848,6 @@ def ask_save_file(master, title, filetypes=(), initdir=DEFAULT_DIR) -> str:
     )
 
 
-class ProgressTracker:
-    def __init__(self,
-                 enable_print_out: bool = True,
-                 update_func=None) -> None:
-        self._enable_print_out = enable_print_out
-        self._update_func = update_func
-        # message
-        # if not exists(LOG_PATH):
-        #     makedirs(LOG_PATH)
-        # time_stamp = self._time_stamp()
-        # name = "{}_{}.log".format(time_stamp.date(), time_stamp.time())
-        # logging.basicConfig(
-        #     filename=join(LOG_PATH, name),
-        #     filemode="w+",
-        #     style="{",
-        #     format="{threadName:<20s} <{levelname:<7s}> "
-        #            "[{asctime:<15s}] {message}",
-        #     level=logging.DEBUG
-        # )
-        self._logger = logging.getLogger("Main Logger")
-        self._logger.setLevel(logging.DEBUG)
-        # tick
-        self._process_name = None
-        self._process_disc = None
-        self._process_disc_fill = None
-        self._init_tick = None
-        self._total_tick = None
-        self._current_tick = None
-        self._start_time = None
-        self._end_time = None
-        self._down_time_start = 0
-        self._down_time_accum = 0
-        self._time_accum = 0
-
-    def init_ticker(self, process_name, process_disc, init_tick, total_tick):
-        if self._current_tick is None or self._current_tick == self._total_tick:
-            self._process_name = process_name
-            self._process_disc = process_disc
-            self._process_disc_fill = None
-            self._init_tick = init_tick
-            self._total_tick = total_tick
-            self._current_tick = init_tick
-            self._start_time = time.time()
-            self._end_time = None
-            self._update(mode=TRACKER_TICK_INIT,
-                         process_name=self._process_name,
-                         process_disc=self._process_disc,
-                         total_tick=self._total_tick,
-                         init_tick=self._init_tick,
-                         start=True)
-            return True
-        return False
-
-    def update_disc_fill(self, fill):
-        self._process_disc_fill = fill
-        time_remain = self.predict_time_remaining()
-        self._update(mode=TRACKER_TICK_DESC_UPDATE,
-                     process_disc=self._process_disc,
-                     process_disc_fill=fill,
-                     total_tick=self._total_tick,
-                     current_tick=self._current_tick,
-                     time_remain=time_remain)
-
-    def reset_ticker(self):
-        self._down_time_start = 0
-        self._down_time_accum = 0
-        self._process_name = None
-        self._process_disc = None
-        self._process_disc_fill = None
-        self._init_tick = None
-        self._total_tick = None
-        self._current_tick = None
-        self._start_time = None
-        self._end_time = None
-
-    def set_indeterminate(self, indeterminate):
-        if indeterminate:
-            # the down time has started
-            self._down_time_start = time.time()
-        else:
-            self._down_time_accum = time.time() - self._down_time_start
-        self._update(
-            mode=TRACKER_SET_INDETERMINATE,
-            indeterminate=indeterminate,
-            process_disc=self._process_disc,
-            process_disc_fill=self._process_disc_fill,
-        )
-
-    def clear_time_accum(self):
-        self._time_accum = 0
-
-    def tick(self, amount: int = 1) -> None:
-        if amount <= 0:
-            return
-        prev = self._current_tick
-        pending_amount = prev + amount
-        if pending_amount < self._total_tick:
-            self._current_tick = pending_amount
-            end = False
-        else:
-            self._current_tick = self._total_tick
-            end = True
-        if end:
-            self._end_time = time.time()
-        time_remain = self.predict_time_remaining()
-        self._update(mode=TRACKER_TICK,
-                     time_remain=time_remain,
-                     process_disc=self._process_disc,
-                     total_tick=self._total_tick,
-                     current_tick=self._current_tick,
-                     amount=self._current_tick - prev,
-                     disc_fill=self._process_disc_fill,
-                     end=end)
-
-    def log(self, message: str, tp=TRACKER_LOG_INFO,
-            exc_info=None,
-            stack_info=False,
-            stacklevel=1,
-            extra=None,
-            prt=False) -> None:
-        if prt:
-            print(message)
-        message = message.strip()
-        self._logger.log(
-            level=tp,
-            msg=message,
-            exc_info=exc_info,
-            stack_info=stack_info,
-            stacklevel=stacklevel,
-            extra=extra
-        )
-        # self._message.append((self._time_stamp(), tp, message))
-        self._update(mode=TRACKER_LOG, tp=tp, prt=prt, message=message)
-
-    def time_elapsed(self, use_time_accum=False) -> str:
-        if not use_time_accum:
-            if self._start_time is None or self._end_time is None:
-                return ""
-            time_elapsed = self._end_time - self._start_time
-        else:
-            time_elapsed = self._time_accum
-        return self._format_time(time_elapsed)
-
-    @staticmethod
-    def _time_stamp():
-        return datetime.fromtimestamp(time.time())
-
-    @staticmethod
-    def _format_time(time_):
-        hours, rem = divmod(time_, 3600)
-        minutes, second = divmod(rem, 60)
-        return "{:0>2}:{:0>2}:{:0>2}".format(int(hours), int(minutes),
-                                             int(second))
-
-    def predict_time_remaining(self):
-        if self._start_time is None:
-            return ""
-        time_elapsed = time.time() - self._start_time - self._down_time_accum
-        tick_passed = self._current_tick - self._init_tick
-        if tick_passed == 0:
-            return "未知"
-        average_time_use_per_tick = time_elapsed / tick_passed
-        time_remaining = average_time_use_per_tick * (
-                self._total_tick - self._current_tick)
-        return self._format_time(round(time_remaining))
-
-    def _update(self, **kwargs):
-        if kwargs["mode"] == TRACKER_TICK:
-            amount = kwargs["amount"]
-            end = kwargs["end"]
-            if self._enable_print_out:
-                # if this is the first time printing, we also print the header
-                print("=" * amount, end="")
-                if end:
-                    time_elapsed = self.time_elapsed()
-                    print("| Time Elapsed : {}".format(time_elapsed))
-                    # also log itself
-                    self.log(
-                        "{} 结束！ 用时 : {} [desc={}, init={}, total={}]".format(
-                            self._process_name,
-                            time_elapsed,
-                            self._process_disc,
-                            self._init_tick,
-                            self._total_tick,
-                        ))
-                    self._time_accum += self._end_time - self._start_time
-        elif kwargs["mode"] == TRACKER_TICK_INIT:
-            start = kwargs["start"]
-            if start:
-                print("{0:s} {1:>5d}|".format(self._process_name,
-                                              self._total_tick), end="")
-        if self._update_func is not None:
-            self._update_func(**kwargs)
-
-
 class SizeConfig:
     def total_size(self):
         raise NotImplementedError
@@ -1509,7 +1313,8 @@ class LoadDataThread(threading.Thread):
             self._return_value = load_data.prepare_data(
                 root_path=root_path,
                 index_path=index_path,
-                tracker=self._tracker
+                tracker=self._tracker,
+                store=ArtifactStore(join(root_path, ARTIFACT_PATH))
             )
         except ValueError as v:
             message = str(v)
@@ -1564,6 +1369,7 @@ class ExtractionThread(threading.Thread):
             INFO_ANALYZE_SUGGESTION_WORD,
             INFO_ANALYZE_WHITELIST_WORD,
             INFO_ANALYZE_BLACKLIST_WORD,
+            INFO_ANALYZE_COUNT_MODE,
         ]
         try:
             self._info_handler.freeeze(vars_)
@@ -1575,6 +1381,8 @@ class ExtractionThread(threading.Thread):
                 INFO_ANALYZE_SUGGESTION_WORD)
             whitelist_word = self._info_handler.get(INFO_ANALYZE_WHITELIST_WORD)
             blacklist_word = self._info_handler.get(INFO_ANALYZE_BLACKLIST_WORD)
+            count_mode = self._info_handler.get(INFO_ANALYZE_COUNT_MODE)
+            root_path = self._info_handler.get(INFO_PATH_ROOT)
             self._return_value = word_extraction.summarise(
                 data=articles,
                 suggestion_word=suggestion_word,
@@ -1583,7 +1391,14 @@ class ExtractionThread(threading.Thread):
                 num_wanted=num_wanted,
                 extractor=extractor,
                 tracker=self._tracker,
-                allowPOS=allowPOS
+                allowPOS=allowPOS,
+                store=ArtifactStore(join(root_path, ARTIFACT_PATH)),
+                snapshot_folder=join(root_path, TEMP_PATH,
+                                     TOKENIZER_SNAPSHOT_PATH),
+                count_tokens=count_mode == COUNT_MODE_TOKEN,
+                token_cache_folder=join(root_path, TEMP_PATH,
+                                        TOKEN_CACHE_PATH),
+                idf_path=join(root_path, TEMP_PATH, IDF_STORE_FILE)
             )
         except ValueError as v:
             message = str(v)
@@ -1632,7 +1447,8 @@ class AnalyzeThread(threading.Thread):
         self._tracker.log("启动统计分析线程!")
         vars_ = [
             INFO_TAGS, INFO_ARTICLES, INFO_SORTING,
-            INFO_ANALYZE_STAT_ANALYZER
+            INFO_ANALYZE_STAT_ANALYZER, INFO_ANALYZE_COUNT_MODE,
+            INFO_TOKEN_COUNTS
         ]
         try:
             self._info_handler.freeeze(vars_)
@@ -1641,12 +1457,21 @@ class AnalyzeThread(threading.Thread):
             sorting = self._info_handler.get(INFO_SORTING)
             statistics_analyzer = self._info_handler.get(
                 INFO_ANALYZE_STAT_ANALYZER)
+            token_counts = None
+            if self._info_handler.get(INFO_ANALYZE_COUNT_MODE) == \
+                    COUNT_MODE_TOKEN:
+                token_counts = self._info_handler.get(INFO_TOKEN_COUNTS)
+                if token_counts is None:
+                    raise ValueError("没有分词词频! 请在按分词计数时重新抽取词汇!")
+            root_path = self._info_handler.get(INFO_PATH_ROOT)
             self._return_value = word_statistics.analyze(
                 segment=segment,
                 articles=articles,
                 sorting=sorting,
                 tracker=self._tracker,
-                statistics_analyzer=statistics_analyzer
+                statistics_analyzer=statistics_analyzer,
+                store=ArtifactStore(join(root_path, ARTIFACT_PATH)),
+                token_counts=token_counts
             )
         except ValueError as v:
             message = str(v)
@@ -1680,6 +1505,113 @@ class AnalyzeThread(threading.Thread):
         return self._error is None
 
 
+class RestoreThread(threading.Thread):
+    """
+    从根目录的 artifact 文件夹恢复 start 及之后步骤的结果，
+    结果为 [(键, 值), ...]，由主线程放入 info_handler
+    """
+
+    ordered = [INFO_ARTICLES, INFO_TAGS, INFO_ANALYZED_SUMMARY]
+
+    def __init__(self, tracker, info_handler, start):
+        super().__init__(name="Restore Thread", daemon=True)
+        self._info_handler = info_handler
+        self._tracker = tracker
+        self._start = start
+        self._finished = False
+        self._return_value = []
+        self._error = None
+
+    def run(self):
+        ordered = self.ordered
+        i = ordered.index(self._start)
+        restored_fields = self._return_value
+        try:
+            root_path = self._info_handler.get(INFO_PATH_ROOT)
+            store = ArtifactStore(join(root_path, ARTIFACT_PATH))
+            if i <= ordered.index(INFO_ARTICLES):
+                restored = load_data.restore_data(
+                    root_path=root_path,
+                    index_path=self._info_handler.get(INFO_PATH_INDEX),
+                    store=store
+                )
+                if restored is None:
+                    return
+                articles, sorting = restored
+                restored_fields.append((INFO_ARTICLES, articles))
+                restored_fields.append((INFO_SORTING, sorting))
+                self._tracker.log("已恢复上次装载的数据", prt=True)
+            else:
+                articles = self._info_handler.get(INFO_ARTICLES)
+                sorting = self._info_handler.get(INFO_SORTING)
+            count_tokens = self._info_handler.get(
+                INFO_ANALYZE_COUNT_MODE) == COUNT_MODE_TOKEN
+            if i <= ordered.index(INFO_TAGS):
+                restored = word_extraction.restore_summary(
+                    data=articles,
+                    suggestion_word=self._info_handler.get(
+                        INFO_ANALYZE_SUGGESTION_WORD),
+                    whitelist_word=self._info_handler.get(
+                        INFO_ANALYZE_WHITELIST_WORD),
+                    blacklist_word=self._info_handler.get(
+                        INFO_ANALYZE_BLACKLIST_WORD),
+                    allowPOS=self._info_handler.get(INFO_ANALYZE_ALLOW_POS),
+                    num_wanted=self._info_handler.get(INFO_ANALYZE_NUM_WANTED),
+                    extractor=self._info_handler.get(INFO_ANALYZE_EXTRACTOR),
+                    store=store,
+                    count_tokens=count_tokens,
+                    idf_path=join(root_path, TEMP_PATH, IDF_STORE_FILE)
+                )
+                if restored is None:
+                    return
+                segments, token_counts = restored
+                restored_fields.append((INFO_TAGS, segments))
+                restored_fields.append((INFO_TOKEN_COUNTS, token_counts))
+                self._tracker.log("已恢复上次抽取的词汇", prt=True)
+            else:
+                segments = self._info_handler.get(INFO_TAGS)
+                token_counts = self._info_handler.get(INFO_TOKEN_COUNTS) \
+                    if count_tokens else None
+            if count_tokens and token_counts is None:
+                return
+            result = word_statistics.restore_analysis(
+                segment=segments,
+                articles=articles,
+                sorting=sorting,
+                statistics_analyzer=self._info_handler.get(
+                    INFO_ANALYZE_STAT_ANALYZER),
+                store=store,
+                token_counts=token_counts
+            )
+            if result is None:
+                return
+            summary, detail = result
+            restored_fields.append((INFO_ANALYZED_SUMMARY, summary))
+            restored_fields.append((INFO_ANALYZED_DETAIL, detail))
+            self._tracker.log("已恢复上次的统计分析", prt=True)
+        except ValueError:
+            # some field is not ready, nothing more to restore
+            return
+        except Exception as e:
+            self._error = (str(e), THREAD_OTHER_ERROR)
+            self._tracker.log("恢复上次的结果失败! [error='{}']".format(str(e)),
+                              tp=TRACKER_LOG_ERROR, exc_info=e, prt=True)
+        finally:
+            self._finished = True
+
+    def is_finished(self):
+        return self._finished
+
+    def get_error(self):
+        return self._error
+
+    def get_return_value(self):
+        return self._return_value
+
+    def is_successful(self):
+        return self._error is None
+
+
 class ExportThread(threading.Thread):
     def __init__(self, tracker, info_handler):
         super().__init__(name="Export Thread", daemon=True)
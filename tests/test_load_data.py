@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+import unittest
+import zipfile
+from datetime import datetime
+
+from hf_analysis.processing.load_data import read_excel_rows
+
+WORKBOOK = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+ xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">
+<sheets><sheet name="Sheet1" sheetId="1" r:id="rId1"/></sheets>
+</workbook>"""
+
+RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships
+ xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1"
+ Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"
+ Target="worksheets/sheet1.xml"/>
+</Relationships>"""
+
+SHEET = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">
+<sheetData>
+<row r="1">
+<c r="A1" t="inlineStr"><is><t>title</t></is></c>
+<c r="B1" t="inlineStr"><is><t>date</t></is></c>
+<c r="C1" t="inlineStr"><is><t>count</t></is></c>
+</row>
+<row r="2">
+<c r="A2" t="inlineStr"><is><t>a</t></is></c>
+<c r="B2" t="d"><v>2019-03-01T08:30:00Z</v></c>
+<c r="C2"><v>2019</v></c>
+</row>
+<row r="3">
+<c r="A3" t="inlineStr"><is><t>b</t></is></c>
+<c r="B3" t="d"><v>2019-03-01</v></c>
+<c r="C3"><v>1.5</v></c>
+</row>
+<row r="4">
+<c r="A4" t="inlineStr"><is><t>c</t></is></c>
+<c r="B4" t="d"><v>08:30:00</v></c>
+</row>
+</sheetData>
+</worksheet>"""
+
+
+class ReadExcelRowsTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, "index.xlsx")
+        with zipfile.ZipFile(self.path, "w") as archive:
+            archive.writestr("xl/workbook.xml", WORKBOOK)
+            archive.writestr("xl/_rels/workbook.xml.rels", RELS)
+            archive.writestr("xl/worksheets/sheet1.xml", SHEET)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_date_cells(self):
+        rows = list(read_excel_rows(self.path))
+        self.assertEqual(rows, [
+            ["a", datetime(2019, 3, 1, 8, 30), 2019],
+            ["b", datetime(2019, 3, 1), 1.5],
+            # a time without a date is kept as written
+            ["c", "08:30:00", None],
+        ])
+
+
+if __name__ == "__main__":
+    unittest.main()
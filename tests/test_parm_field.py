@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+import tkinter as tk
+import unittest
+
+from hf_analysis.ui.parm_field import *
+
+
+class RightStatAnalyzerFrameTest(unittest.TestCase):
+    def setUp(self):
+        try:
+            self.root = tk.Tk()
+        except tk.TclError as e:
+            self.skipTest("no display: {}".format(e))
+        self.root.withdraw()
+
+    def tearDown(self):
+        self.root.destroy()
+
+    def test_build(self):
+        info_handler = InfoHandler()
+        frame = RightStatAnalyzerFrame(
+            master=self.root, size_conf=TopDownSizeConfig(400, 100),
+            info_handler=info_handler
+        )
+        self.root.update_idletasks()
+        self.assertEqual(info_handler.get(INFO_ANALYZE_STAT_ANALYZER),
+                         TREND_ANALYZER)
+        self.assertEqual(info_handler.get(INFO_ANALYZE_COUNT_MODE),
+                         COUNT_MODE_SUBSTRING)
+        # the two radio groups sit side by side in the row
+        stat = frame.select_stat_analyze.place_info()
+        mode = frame.select_count_mode.place_info()
+        self.assertEqual(stat["y"], mode["y"])
+        self.assertLess(int(stat["x"]), int(mode["x"]))
+
+
+if __name__ == "__main__":
+    unittest.main()